@@ -1,6 +1,6 @@
 # babyagi/api/__init__.py
 
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, Response, jsonify, request, g
 from datetime import datetime
 from io import StringIO
 import logging
@@ -8,6 +8,9 @@ import os
 import sys
 import importlib.util
 
+from babyagi.functionz.core.metrics import render_prometheus
+from babyagi.functionz.core.profiling import render_flamegraph
+
 logger = logging.getLogger(__name__)
 
 def create_api_blueprint():
@@ -67,7 +70,10 @@ def create_api_blueprint():
                 kwargs = params.pop('kwargs', {})
                 result = g.functionz.executor.execute(function_name, inner_function_name, *args, **kwargs)
             else:
-                # Normal execution for other functions
+                # Normal execution for other functions; a W3C traceparent header makes its span part of the caller's trace
+                traceparent = request.headers.get('traceparent')
+                if traceparent:
+                    params['trace_parent'] = traceparent
                 result = g.functionz.executor.execute(function_name, **params)
 
             logger.info(f"Function '{function_name}' executed successfully.")
@@ -137,6 +143,28 @@ def create_api_blueprint():
             logger.error(f"Error getting log bundle for log_id '{log_id}': {str(e)}", exc_info=True)
             return jsonify({"error": str(e)}), 500
 
+    @api.route('/profile/<int:log_id>')
+    def get_profile(log_id):
+        logger.debug(f"Accessing /api/profile/{log_id} route.")
+        try:
+            profile = g.functionz.db.get_profile(log_id)
+            if profile is None:
+                logger.warning(f"No profile for log_id '{log_id}'.")
+                return jsonify({"error": f"No profile for log_id '{log_id}'"}), 404
+            fmt = request.args.get('format', 'json')
+            if fmt == 'svg':
+                svg = render_flamegraph(profile['stacks'], title=f"Log {log_id}: {profile['samples']} samples "
+                                                                 f"every {profile['interval'] * 1000:g} ms")
+                return Response(svg, mimetype='image/svg+xml', headers={
+                    'Content-Disposition': f'attachment; filename=flamegraph-{log_id}.svg'})
+            if fmt == 'collapsed':
+                return Response(profile['stacks'] + '\n', mimetype='text/plain', headers={
+                    'Content-Disposition': f'attachment; filename=profile-{log_id}.folded'})
+            return jsonify(profile)
+        except Exception as e:
+            logger.error(f"Error getting profile for log_id '{log_id}': {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
 
     @api.route('/triggers/<function_name>', methods=['GET'])
     def get_triggers(function_name):
@@ -153,6 +181,84 @@ def create_api_blueprint():
             logger.error(f"Error getting triggers for function {function_name}: {str(e)}", exc_info=True)
             return jsonify({"error": str(e)}), 500
 
+    @api.route('/circuit_breakers', methods=['GET'])
+    def get_circuit_breakers():
+        logger.debug("Accessing /api/circuit_breakers route.")
+        try:
+            return jsonify(g.functionz.get_breaker_states())
+        except Exception as e:
+            logger.error(f"Error getting circuit breaker states: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @api.route('/circuit_breakers/<function_name>/reset', methods=['POST'])
+    def reset_circuit_breaker(function_name):
+        logger.debug(f"Accessing /api/circuit_breakers/{function_name}/reset [POST] route.")
+        try:
+            if not g.functionz.reset_breaker(function_name):
+                logger.warning(f"No circuit breaker for function '{function_name}'.")
+                return jsonify({"error": f"No circuit breaker for function '{function_name}'"}), 404
+            logger.info(f"Circuit breaker for function '{function_name}' reset.")
+            return jsonify({"status": "reset"})
+        except Exception as e:
+            logger.error(f"Error resetting circuit breaker for function {function_name}: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @api.route('/phase_stats', methods=['GET'])
+    def get_phase_stats():
+        logger.debug("Accessing /api/phase_stats route.")
+        try:
+            return jsonify(g.functionz.get_phase_stats(request.args.get('function_name')))
+        except Exception as e:
+            logger.error(f"Error getting phase stats: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @api.route('/resource_stats', methods=['GET'])
+    def get_resource_stats():
+        logger.debug("Accessing /api/resource_stats route.")
+        try:
+            return jsonify(g.functionz.get_resource_stats(request.args.get('function_name')))
+        except Exception as e:
+            logger.error(f"Error getting resource stats: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @api.route('/metrics', methods=['GET'])
+    def get_metrics():
+        logger.debug("Accessing /api/metrics route.")
+        try:
+            # Built from in-memory aggregates only; scraping does not touch the database
+            return Response(render_prometheus(g.functionz), mimetype='text/plain; version=0.0.4')
+        except Exception as e:
+            logger.error(f"Error rendering metrics: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @api.route('/recent', methods=['GET'])
+    def get_recent_executions():
+        logger.debug("Accessing /api/recent route.")
+        try:
+            limit = request.args.get('limit')
+            return jsonify(g.functionz.get_recent_executions(request.args.get('function_name'),
+                                                             int(limit) if limit else None))
+        except ValueError:
+            logger.warning("Invalid limit provided.")
+            return jsonify({"error": "Invalid limit. Use an integer."}), 400
+        except Exception as e:
+            logger.error(f"Error getting recent executions: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @api.route('/recent/percentiles', methods=['GET'])
+    def get_latency_percentiles():
+        logger.debug("Accessing /api/recent/percentiles route.")
+        try:
+            window = request.args.get('window')
+            return jsonify(g.functionz.get_latency_percentiles(request.args.get('function_name'),
+                                                               float(window) if window else None))
+        except ValueError:
+            logger.warning("Invalid window provided.")
+            return jsonify({"error": "Invalid window. Use a number of seconds."}), 400
+        except Exception as e:
+            logger.error(f"Error getting latency percentiles: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
 
     logger.info("API blueprint created successfully.")
     return api
@@ -0,0 +1,169 @@
+# core/caching.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from types import CodeType
+from typing import Dict, List, Optional, Tuple, Any
+
+
+class CodeCache:
+    """Compiled code objects keyed by (function name, version)."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, int], Tuple[str, CodeType]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(self, name: str, version: int, code: str) -> CodeType:
+        key = (name, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            # Two databases can hold the same (name, version) with different
+            # source, so the stored source is compared before reuse.
+            if entry is not None and entry[0] == code:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        compiled = compile(code, f"<functionz:{name}@v{version}>", 'exec')
+        with self._lock:
+            self._entries[key] = (code, compiled)
+        return compiled
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == name]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+class ClosureCache:
+    """Resolved dependency closures keyed by root function name.
+
+    Each entry is the topologically ordered list of function versions a call
+    needs, dependencies first and the root function last.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            closure = self._entries.get(name)
+            if closure is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return closure
+
+    def set(self, name: str, closure: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._entries[name] = closure
+
+    def invalidate(self, name: str) -> List[str]:
+        """Drop every closure containing `name` and return the roots that were dropped."""
+        # A version change affects every closure the function appears in,
+        # not only the one rooted at it.
+        with self._lock:
+            roots = [r for r, closure in self._entries.items()
+                     if any(f['name'] == name for f in closure)]
+            for root in roots:
+                del self._entries[root]
+            return roots
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+class ResultCache:
+    """
+    Memoized results for functions registered with metadata={"cache": {...}}.
+
+    Entries are kept per function in LRU order, bounded by the function's
+    `max_entries` option and optionally expired after `ttl` seconds. Results
+    are stored and returned as deep copies, so callers mutating what they got
+    back cannot change what later hits return.
+    """
+
+    DEFAULT_MAX_ENTRIES = 128
+
+    def __init__(self):
+        self._entries: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def options(function_version: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        options = (function_version.get('metadata') or {}).get('cache')
+        if not options:
+            return None
+        return options if isinstance(options, dict) else {}
+
+    def get(self, name: str, key: Any) -> Tuple[bool, Any]:
+        with self._lock:
+            entries = self._entries.get(name)
+            entry = entries.get(key) if entries else None
+            if entry is None or (entry[0] is not None and entry[0] <= time.monotonic()):
+                if entry is not None:
+                    del entries[key]
+                self.misses += 1
+                return False, None
+            entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        # Copied outside the lock; the stored value itself is never handed out
+        return True, copy.deepcopy(value)
+
+    def put(self, name: str, key: Any, value: Any, options: Dict[str, Any]) -> None:
+        max_entries = options.get('max_entries', self.DEFAULT_MAX_ENTRIES)
+        ttl = options.get('ttl')
+        expires_at = time.monotonic() + ttl if ttl else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            entries = self._entries.setdefault(name, OrderedDict())
+            entries[key] = (expires_at, value)
+            entries.move_to_end(key)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': sum(len(entries) for entries in self._entries.values())}
+
+
+# Shared by every executor in the process.
+code_cache = CodeCache()
@@ -0,0 +1,131 @@
+# core/circuit_breaker.py
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of running a function whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker for one function, configured with
+    metadata={"circuit_breaker": {...}} (or True for the defaults).
+
+    Closed: calls run and their outcomes fill a sliding window. Once the
+    window holds at least `min_calls` outcomes and the share of failures
+    reaches `error_rate`, the breaker opens.
+    Open: calls are rejected without running for `reset_timeout` seconds,
+    then the breaker goes half-open.
+    Half-open: a single trial call runs; success closes the breaker, failure
+    opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    DEFAULTS = {'window': 20, 'min_calls': 5, 'error_rate': 0.5, 'reset_timeout': 30.0}
+
+    def __init__(self, options: Dict[str, Any]):
+        self.options = options
+        settings = dict(self.DEFAULTS, **options)
+        self.window = int(settings['window'])
+        self.min_calls = int(settings['min_calls'])
+        self.error_rate = float(settings['error_rate'])
+        self.reset_timeout = float(settings['reset_timeout'])
+        self._outcomes = deque(maxlen=self.window)
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._opened_at = None
+        self._opened_wall = None
+        self._trial = False
+
+    @staticmethod
+    def options(function_version: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        options = (function_version.get('metadata') or {}).get('circuit_breaker')
+        if not options:
+            return None
+        return options if isinstance(options, dict) else {}
+
+    @property
+    def has_fallback(self) -> bool:
+        return 'fallback' in self.options
+
+    @property
+    def fallback(self) -> Any:
+        return self.options.get('fallback')
+
+    def allow(self) -> bool:
+        """Whether a call may run now; a True in half-open state makes the caller the trial call."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            if self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial = False
+                if success:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            if self.state == self.OPEN:
+                # A call admitted before the breaker opened
+                return
+            self._outcomes.append(success)
+            if len(self._outcomes) >= self.min_calls and self._failure_rate() >= self.error_rate:
+                self._open()
+
+    def abandon(self) -> None:
+        """Releases the half-open trial when the admitted call ended before running the function."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._outcomes.clear()
+            self._trial = False
+            self._opened_at = None
+            self._opened_wall = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_at = None
+            if self.state == self.OPEN:
+                retry_at = (self._opened_wall + timedelta(seconds=self.reset_timeout)).isoformat()
+            return {
+                'state': self.state,
+                'calls': len(self._outcomes),
+                'failures': self._outcomes.count(False),
+                'error_rate': self._failure_rate(),
+                'opened_at': self._opened_wall.isoformat() if self._opened_wall else None,
+                'retry_at': retry_at,
+                'settings': {'window': self.window, 'min_calls': self.min_calls,
+                             'error_rate': self.error_rate, 'reset_timeout': self.reset_timeout},
+                'fallback': self.has_fallback,
+            }
+
+    def _failure_rate(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._opened_wall = datetime.now()
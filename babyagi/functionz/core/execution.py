@@ -1,16 +1,241 @@
+import asyncio
+import contextvars
+import os
 import subprocess
 import sys
 import importlib
 import inspect
-from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
+from types import CodeType
 import logging
 
+from .caching import code_cache, ClosureCache, ResultCache
+from .validation import ArgumentValidator
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .timeouts import FunctionTimeout, QueueTimeout, remaining, resolve_deadline
+from .metrics import CallStats, ExecutionRing, PhaseStats, ResourceStats, ResourceTracker
+from .profiling import StackSampler, profile_interval
+from .tracing import STATUS_ERROR, STATUS_OK, Span, SpanExporter, Tracer
+from . import process_pool
+
 logger = logging.getLogger(__name__)
 
+
+class _NestedCalls:
+    """
+    Dependency calls made in-process during one execution. They run the
+    callables already resolved into the execution's scope and are logged as
+    in-memory records, written as child logs when the execution ends.
+    """
+
+    __slots__ = ('versions', 'secret_keys', 'deadline', 'eligible', 'records', 'closed', '_lock', '_local')
+
+    def __init__(self, closure: List[Dict[str, Any]], secret_keys: Dict[str, str], deadline: Optional[float] = None):
+        self.versions = {function_version['name']: function_version for function_version in closure}
+        self.secret_keys = secret_keys
+        self.deadline = deadline
+        self.eligible: Dict[str, bool] = {}
+        self.records: List[Dict[str, Any]] = []
+        self.closed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def stack(self) -> List[int]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def add(self, record: Dict[str, Any]) -> int:
+        with self._lock:
+            self.records.append(record)
+            return len(self.records) - 1
+
+
+class _Limiter:
+    """Concurrency slots of one function registered with metadata={"max_concurrency": N}."""
+
+    __slots__ = ('limit', 'semaphore', 'waiting', 'active', '_lock')
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.waiting = 0
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float]) -> bool:
+        with self._lock:
+            self.waiting += 1
+        acquired = False
+        try:
+            acquired = self.semaphore.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+                if acquired:
+                    self.active += 1
+        return acquired
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+        self.semaphore.release()
+
+
+class _Call:
+    """State of one execution, carried from its start to its end."""
+
+    __slots__ = ('function_name', 'executed_functions', 'parent_log_id', 'triggered_by_log_id', 'start_time',
+                 'function_version', 'log_id', 'func', 'bound_args', 'cache_key', 'cache_options', 'done', 'output',
+                 'nested', 'deadline', 'limiter', 'wait_time', 'breaker', 'phases',
+                 'profile', 'resources', 'span')
+
+    def __init__(self, function_name: str, executed_functions: List[str], parent_log_id: Optional[int],
+                 triggered_by_log_id: Optional[int]):
+        self.function_name = function_name
+        self.executed_functions = executed_functions
+        self.parent_log_id = parent_log_id
+        self.triggered_by_log_id = triggered_by_log_id
+        self.start_time = datetime.now()
+        self.function_version = None
+        self.log_id = None
+        self.func = None
+        self.bound_args = None
+        self.cache_key = None
+        self.cache_options = None
+        self.done = False
+        self.output = None
+        self.nested = None
+        self.deadline = None
+        self.limiter = None
+        self.wait_time = None
+        self.breaker = None
+        # Seconds spent in each phase, see metrics.PHASES
+        self.phases: Dict[str, float] = {}
+        # Sampling interval in seconds when the call is profiled
+        self.profile = None
+        # Resource usage of the function body, when the function tracks it
+        self.resources = None
+        # Trace span of the call, when the executor has a span exporter
+        self.span = None
+
+    def mark(self, phase: str, since: float) -> float:
+        """Adds the time elapsed since `since` (a perf_counter reading) to `phase` and returns the current reading."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - since
+        return now
+
+
 class FunctionExecutor:
-    def __init__(self, python_func):
+    def __init__(self, python_func, unit_of_work: bool = False, trigger_workers: int = 0,
+                 deferred_workers: int = 1, process_workers: Optional[int] = None, recent_executions: int = 1024):
         self.python_func = python_func
+        # When set, all database reads and writes of one call tree share a
+        # session and commit once. Without the log buffer this holds the
+        # SQLite write lock until the outermost call returns.
+        self.unit_of_work = unit_of_work
+        self.code_cache = code_cache
+        self.closure_cache = ClosureCache()
+        self.result_cache = ResultCache()
+        self._validators: Dict[tuple, ArgumentValidator] = {}
+        python_func.db.add_version_listener(self.invalidate_function)
+        self._local = threading.local()
+        self._trigger_pool: Optional[ThreadPoolExecutor] = None
+        self.set_trigger_workers(trigger_workers)
+        # Background workers for triggers marked as deferred (fire-and-forget)
+        self._deferred_pool = ThreadPoolExecutor(max_workers=deferred_workers, thread_name_prefix='functionz-deferred')
+        # Pending coalesced trigger batches, keyed by triggered function name
+        self._coalescing: Dict[str, Dict[str, Any]] = {}
+        self._coalesce_lock = threading.Lock()
+        # Warm worker processes for functions registered with metadata={"executor": "process"},
+        # started on first use
+        self.process_workers = process_workers
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_lock = threading.Lock()
+        self._process_calls = 0
+        # Per-function concurrency slots, keyed by function name
+        self._limiters: Dict[str, _Limiter] = {}
+        self._limiters_lock = threading.Lock()
+        # Circuit breakers of functions registered with a circuit_breaker option, keyed by function name
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        # Buffers at least this many bytes cross to workers through shared memory; 0 disables
+        self.shm_threshold = process_pool.SHM_THRESHOLD
+        self._segment_ids = itertools.count()
+        # Per-function totals of the phase timings stored on each log
+        self.phase_stats = PhaseStats()
+        # Per-function call counts by outcome and latency histograms
+        self.call_stats = CallStats()
+        # Summaries of the last finished executions, for live views that must not query the logs table
+        self.recent = ExecutionRing(recent_executions)
+        # Per-function totals of resource usage, for functions with track_resources
+        self.resource_stats = ResourceStats()
+        # Emits a span per execution once a span exporter is set
+        self.tracer: Optional[Tracer] = None
+
+    def set_span_exporter(self, exporter: Optional[SpanExporter]) -> None:
+        """Sends a trace span for every execution to `exporter`; None turns tracing off."""
+        old_tracer, self.tracer = self.tracer, Tracer(exporter) if exporter is not None else None
+        if old_tracer is not None and old_tracer.exporter is not exporter:
+            old_tracer.exporter.shutdown()
+
+    def set_trigger_workers(self, max_workers: int) -> None:
+        """Run independent triggers concurrently on a pool of this size; 0 runs them serially."""
+        old_pool = self._trigger_pool
+        self._trigger_pool = None
+        if max_workers > 0:
+            self._trigger_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='functionz-trigger',
+                                                    initializer=self._mark_trigger_thread)
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def _mark_trigger_thread(self) -> None:
+        self._local.in_trigger_pool = True
+
+    def invalidate_function(self, function_name: str) -> None:
+        """Drop cached artifacts for a function whose active version changed."""
+        self.code_cache.invalidate(function_name)
+        # Memoized results of every function depending on this one are stale too
+        for root in self.closure_cache.invalidate(function_name) + [function_name]:
+            self.result_cache.invalidate(root)
+        for key in [k for k in self._validators if k[0] == function_name]:
+            self._validators.pop(key, None)
+
+    def _compile(self, function_version: Dict[str, Any]):
+        return self.code_cache.get_or_compile(function_version['name'], function_version['version'],
+                                              function_version['code'])
+
+    def _get_validator(self, function_version: Dict[str, Any], func: Optional[callable] = None) -> ArgumentValidator:
+        """The version's argument validator, built from `func` (or a scratch exec of its code) on first use."""
+        key = (function_version['name'], function_version['version'])
+        validator = self._validators.get(key)
+        if validator is None:
+            if func is None:
+                scope = {}
+                exec(self._compile(function_version), scope)
+                func = scope[function_version['name']]
+            validator = self._validators[key] = ArgumentValidator(function_version, func)
+        return validator
+
+    def _result_cache_key(self, function_version: Dict[str, Any], args: tuple, kwargs: dict) -> tuple:
+        """Stable memoization key and bound parameters; the key is None when the arguments cannot be keyed."""
+        try:
+            bound_args = self._get_validator(function_version).bind(args, kwargs)
+            payload = json.dumps(bound_args.arguments, sort_keys=True)
+        except Exception:
+            return None, {}
+        return (function_version['version'], hashlib.sha256(payload.encode()).hexdigest()), dict(bound_args.arguments)
 
     def _install_external_dependency(self, package_name: str, imp_name: str) -> Any:
         try:
@@ -19,50 +244,582 @@ class FunctionExecutor:
             subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
             return importlib.import_module(package_name)
 
-    def _resolve_dependencies(self, function_version: Dict[str, Any], local_scope: Dict[str, Any],
+    def _get_closure(self, function_name: str) -> Optional[List[Dict[str, Any]]]:
+        closure = self.closure_cache.get(function_name)
+        if closure is None:
+            functions = self.python_func.db.get_function_closure(function_name)
+            if function_name not in functions:
+                return None
+            closure = self._order_closure(function_name, functions)
+            self.closure_cache.set(function_name, closure)
+        return closure
+
+    def _order_closure(self, function_name: str, functions: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ordered = []
+        visited = set()
+
+        def visit(name):
+            visited.add(name)
+            function_version = functions.get(name)
+            if not function_version:
+                raise ValueError(f"Dependency '{name}' not found in the database.")
+            for dep_name in function_version.get('dependencies', []):
+                if dep_name not in visited:
+                    visit(dep_name)
+            ordered.append(function_version)
+
+        visit(function_name)
+        return ordered
+
+    def _resolve_dependencies(self, closure: List[Dict[str, Any]], local_scope: Dict[str, Any],
                               parent_log_id: Optional[int], executed_functions: List[str],
-                              visited: Optional[set] = None) -> None:
-        if visited is None:
-            visited = set()
+                              nested: Optional[_NestedCalls] = None) -> None:
+        for function_version in closure:
+            for imp in function_version['function_imports']:
+                lib_name = imp['lib'] if imp['lib'] else imp['name']
+                if lib_name not in local_scope:
+                    module = self._install_external_dependency(lib_name, imp['name'])
+                    local_scope[imp['name']] = module
 
-        function_name = function_version['name']
-        function_imports = self.python_func.db.get_function_imports(function_name)
-
-        for imp in function_imports:
-            lib_name = imp['lib'] if imp['lib'] else imp['name']
-            if lib_name not in local_scope:
-                module = self._install_external_dependency(lib_name, imp['name'])
-                local_scope[imp['name']] = module
-
-        for dep_name in function_version.get('dependencies', []):
-            if dep_name not in local_scope and dep_name not in visited:
-                visited.add(dep_name)
-                dep_data = self.python_func.db.get_function(dep_name)
-                if not dep_data:
-                    raise ValueError(f"Dependency '{dep_name}' not found in the database.")
-                self._resolve_dependencies(dep_data, local_scope, parent_log_id, executed_functions, visited)
-                exec(dep_data['code'], local_scope)
-                if dep_name in local_scope:
-                    dep_func = local_scope[dep_name]
-                    # Wrap the dependent function
-                    local_scope[dep_name] = self._create_function_wrapper(dep_func, dep_name, parent_log_id, executed_functions)
-
-    def _create_function_wrapper(self, func: callable, func_name: str, parent_log_id: int, executed_functions: List[str]):
+        # The closure is ordered dependencies first, with the function itself last; a coroutine
+        # function awaits its dependencies, so they hand it awaitables
+        awaitable = self._is_coroutine_function(closure[-1])
+        for dep_data in closure[:-1]:
+            dep_name = dep_data['name']
+            if dep_name in local_scope:
+                continue
+            exec(self._compile(dep_data), local_scope)
+            if dep_name in local_scope:
+                dep_func = local_scope[dep_name]
+                # Wrap the dependent function
+                local_scope[dep_name] = self._create_function_wrapper(dep_func, dep_name, parent_log_id, executed_functions,
+                                                                      nested, awaitable)
+
+    def _create_function_wrapper(self, func: callable, func_name: str, parent_log_id: int, executed_functions: List[str],
+                                 nested: Optional[_NestedCalls] = None, awaitable: bool = False):
         def wrapper(*args, **kwargs):
-            return self.execute(func_name, *args, executed_functions=executed_functions, parent_log_id=parent_log_id, **kwargs)
+            # Nested calls share the caller's deadline, so the budget only shrinks with depth
+            deadline = nested.deadline if nested is not None else None
+            if awaitable:
+                # Called from a coroutine function: hand back an awaitable
+                return self.execute_async(func_name, *args, executed_functions=executed_functions,
+                                          parent_log_id=parent_log_id, execution_deadline=deadline, **kwargs)
+            if nested is not None and not nested.closed and self._is_fast_nested(nested, func_name):
+                if func_name not in executed_functions:
+                    executed_functions.append(func_name)
+                return self._call_nested(nested, func, func_name, args, kwargs)
+            return self.execute(func_name, *args, executed_functions=executed_functions, parent_log_id=parent_log_id,
+                                execution_deadline=deadline, **kwargs)
         return wrapper
 
-    def execute(self, function_name: str, *args, executed_functions: Optional[List[str]] = None,
-                parent_log_id: Optional[int] = None, triggered_by_log_id: Optional[int] = None, **kwargs) -> Any:
-        start_time = datetime.now()
-        executed_functions = executed_functions or []
-        log_id = None
-        bound_args = None
-        output = None
+    def _is_fast_nested(self, nested: _NestedCalls, func_name: str) -> bool:
+        """Whether a dependency can skip execute: nothing it does needs a call of its own."""
+        eligible = nested.eligible.get(func_name)
+        if eligible is None:
+            function_version = nested.versions[func_name]
+            metadata = function_version.get('metadata') or {}
+            eligible = (metadata.get('executor') != 'process'
+                        and not metadata.get('max_concurrency')
+                        and not metadata.get('circuit_breaker')
+                        and not metadata.get('profile')
+                        and not metadata.get('track_resources')
+                        and not metadata.get('timeout')
+                        and self.result_cache.options(function_version) is None
+                        and not self._is_coroutine_function(function_version)
+                        and not self.python_func.db.get_triggers_for_function(func_name))
+            if eligible:
+                self._check_key_dependencies(function_version, nested.secret_keys)
+            nested.eligible[func_name] = eligible
+        return eligible
+
+    def _call_nested(self, nested: _NestedCalls, func: callable, func_name: str, args: tuple, kwargs: dict) -> Any:
+        stack = nested.stack()
+        record = {'function_name': func_name, 'timestamp': datetime.now(), 'params': {},
+                  'parent': stack[-1] if stack else None}
+        stack.append(nested.add(record))
+        start = time.perf_counter()
+        try:
+            if nested.deadline is not None and remaining(nested.deadline) <= 0:
+                raise FunctionTimeout(f"Function '{func_name}' was not started: deadline exceeded.")
+            bound_args = self._get_validator(nested.versions[func_name], func).bind(args, kwargs)
+            record['params'] = dict(bound_args.arguments)
+            output = func(*bound_args.args, **bound_args.kwargs)
+            record['log_type'] = 'success'
+            record['output'] = output
+            return output
+        except Exception as e:
+            if isinstance(e, FunctionTimeout):
+                record['log_type'] = 'timeout'
+                record['error'] = str(e) or f"Function '{func_name}' exceeded its deadline."
+            else:
+                record['log_type'] = 'error'
+                record['error'] = str(e)
+            raise
+        finally:
+            record['time_spent'] = time.perf_counter() - start
+            stack.pop()
+
+    def _flush_nested(self, nested: Optional[_NestedCalls], log_id: int, span: Optional[Span] = None) -> None:
+        if nested is None or nested.closed:
+            return
+        nested.closed = True
+        if nested.records:
+            self._write_child_logs(log_id, nested.records, span)
+
+    def execute(self, function_name: str, *args, **kwargs) -> Any:
+        if not self.unit_of_work or getattr(self._local, 'deferred', None) is not None:
+            return self._execute(function_name, *args, **kwargs)
+        # Nested and triggered calls made from this thread join the same unit of work.
+        # Deferred triggers are held back until it commits, so their workers can
+        # see the parent log and are not blocked by its write lock.
+        self._local.deferred = []
+        try:
+            with self.python_func.db.unit_of_work():
+                return self._execute(function_name, *args, **kwargs)
+        finally:
+            deferred, self._local.deferred = self._local.deferred, None
+            for trigger in deferred:
+                self._deferred_pool.submit(self._execute_trigger, *trigger)
+
+    async def execute_async(self, function_name: str, *args, **kwargs) -> Any:
+        """
+        Awaitable counterpart of execute. Coroutine functions are awaited on the
+        running loop; sync functions run in the loop's default thread pool.
+        """
+        closure = self._get_closure(function_name)
+        if not closure or not self._is_coroutine_function(closure[-1]):
+            return await asyncio.to_thread(self.execute, function_name, *args, **kwargs)
+
+        # Database work is blocking, so the start and end of the call run off the loop
+        call = await asyncio.to_thread(self._start_call, function_name, args, kwargs)
+        if call.done:
+            return call.output
+        try:
+            await asyncio.to_thread(self._acquire_slot, call)
+            started = time.perf_counter()
+            # Samples the loop's thread, so other tasks running meanwhile show up too
+            sampler = StackSampler(call.profile).start() if call.profile is not None else None
+            tracker = ResourceTracker().start() if self._tracks_resources(call.function_version) else None
+            token = Tracer.activate(call.span) if call.span is not None else None
+            try:
+                output = await self._await_with_deadline(call, call.func(*call.bound_args.args, **call.bound_args.kwargs))
+            finally:
+                if token is not None:
+                    Tracer.deactivate(token)
+                if tracker is not None:
+                    call.resources = tracker.stop()
+                call.mark('execute', started)
+                if sampler is not None:
+                    await asyncio.to_thread(self._save_profile, call, sampler)
+        except Exception as e:
+            self._record_outcome(call, e)
+            await asyncio.to_thread(self._fail_call, call, e)
+            raise
+        finally:
+            self._release_slot(call)
+        self._record_outcome(call, None)
+        return await asyncio.to_thread(self._finish_call, call, output)
+
+    async def _await_with_deadline(self, call: '_Call', awaitable) -> Any:
+        if call.deadline is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(remaining(call.deadline), 0))
+        except asyncio.TimeoutError:
+            if remaining(call.deadline) > 0:
+                raise
+            raise FunctionTimeout(f"Function '{call.function_name}' exceeded its deadline.") from None
+
+    def _is_coroutine_function(self, function_version: Dict[str, Any]) -> bool:
+        code = self._compile(function_version)
+        return any(isinstance(const, CodeType) and const.co_name == function_version['name']
+                   and const.co_flags & inspect.CO_COROUTINE
+                   for const in code.co_consts)
+
+    def _execute(self, function_name: str, *args, **kwargs) -> Any:
+        call = self._start_call(function_name, args, kwargs)
+        if call.done:
+            return call.output
+        try:
+            if call.deadline is not None and remaining(call.deadline) <= 0:
+                raise FunctionTimeout(f"Function '{function_name}' was not started: deadline exceeded.")
+            if self._runs_on_own_thread(call):
+                output = self._run_until_deadline(function_name, call.deadline, self._run_body, call)
+            else:
+                output = self._run_body(call)
+                # A body run inline is not interrupted, but a result that comes too late is still a timeout
+                if call.deadline is not None and remaining(call.deadline) <= 0:
+                    raise FunctionTimeout(f"Function '{function_name}' exceeded its deadline.")
+        except Exception as e:
+            self._record_outcome(call, e)
+            self._fail_call(call, e)
+            raise
+        self._record_outcome(call, None)
+        return self._finish_call(call, output)
+
+    def _runs_on_own_thread(self, call: '_Call') -> bool:
+        # Process and coroutine bodies are awaited with a timeout already. Under a unit of work the
+        # body must stay on this thread, whose session its nested calls share.
+        return (call.deadline is not None
+                and not self._is_process_function(call.function_version)
+                and not inspect.iscoroutinefunction(call.func)
+                and getattr(self._local, 'deferred', None) is None)
+
+    def _run_until_deadline(self, function_name: str, deadline: float, body: callable, *args) -> Any:
+        """
+        Runs body(*args) on a thread of its own and stops waiting for it at
+        `deadline`. The body is not interrupted: it finishes in the background
+        and its result is discarded, while the dependencies it calls meanwhile
+        fail at once on the expired deadline they inherit.
+        """
+        future = Future()
+        context = contextvars.copy_context()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(context.run(body, *args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f'functionz-{function_name}', daemon=True).start()
+        if not wait([future], timeout=max(remaining(deadline), 0)).done:
+            raise FunctionTimeout(f"Function '{function_name}' exceeded its deadline.")
+        return future.result()
+
+    def _run_body(self, call: '_Call') -> Any:
+        """Runs the function body between taking and releasing its concurrency slot, on the calling thread."""
+        sampler = None
+        tracker = None
+        token = None
+        started = None
+        try:
+            self._acquire_slot(call)
+            started = time.perf_counter()
+            if call.profile is not None and not self._is_process_function(call.function_version):
+                sampler = StackSampler(call.profile, stop_frame=sys._getframe()).start()
+            if self._tracks_resources(call.function_version):
+                tracker = ResourceTracker().start()
+            if call.span is not None:
+                # Calls the function makes in this thread become child spans
+                token = Tracer.activate(call.span)
+            if self._is_process_function(call.function_version):
+                return self._run_in_process(call)
+            if inspect.iscoroutinefunction(call.func):
+                # Coroutine functions called synchronously get their own event loop
+                return asyncio.run(self._await_with_deadline(
+                    call, call.func(*call.bound_args.args, **call.bound_args.kwargs)))
+            output = call.func(*call.bound_args.args, **call.bound_args.kwargs)
+            if inspect.iscoroutine(output):
+                output = asyncio.run(self._await_with_deadline(call, output))
+            return output
+        finally:
+            if token is not None:
+                Tracer.deactivate(token)
+            if tracker is not None:
+                call.resources = tracker.stop()
+            if sampler is not None:
+                sampler.stop()
+            if started is not None:
+                call.mark('execute', started)
+            self._release_slot(call)
+            if sampler is not None:
+                self._save_profile(call, sampler)
+
+    def _tracks_resources(self, function_version: Dict[str, Any]) -> bool:
+        # Work done in a worker process is not seen by this process's counters
+        return (bool((function_version.get('metadata') or {}).get('track_resources'))
+                and not self._is_process_function(function_version))
+
+    def _save_profile(self, call: '_Call', sampler: StackSampler) -> None:
+        """Stops the call's sampler and stores its collapsed stacks under the call's log_id."""
+        stacks = sampler.stop()
+        mark = time.perf_counter()
+        try:
+            self.python_func.db.add_profile(call.log_id, stacks, sampler.samples, sampler.interval)
+        except Exception as e:
+            logger.error(f"Failed to store profile for '{call.function_name}': {str(e)}")
+        call.mark('log_write', mark)
+
+    def _get_breaker(self, function_version: Dict[str, Any]) -> Optional[CircuitBreaker]:
+        options = CircuitBreaker.options(function_version)
+        if options is None:
+            return None
+        name = function_version['name']
+        with self._breakers_lock:
+            breaker = self._breakers.get(name)
+            if breaker is None or breaker.options != options:
+                breaker = self._breakers[name] = CircuitBreaker(options)
+        return breaker
+
+    def _reject_call(self, call: '_Call', breaker: CircuitBreaker) -> '_Call':
+        """Handles a call refused by an open breaker: one 'circuit_open' log row, then the fallback or an error."""
+        time_spent = (datetime.now() - call.start_time).total_seconds()
+        output = breaker.fallback if breaker.has_fallback else None
+        call.log_id = self._add_execution_log(call.function_name, call.start_time, {}, output, time_spent,
+                                              call.parent_log_id, call.triggered_by_log_id, 'circuit_open')
+        if not breaker.has_fallback:
+            error = CircuitOpenError(f"Circuit breaker for function '{call.function_name}' is {breaker.state}; "
+                                     f"call rejected.")
+            self._complete_call(call, 'circuit_open', str(error))
+            raise error
+        self._complete_call(call, 'circuit_open')
+        call.done = True
+        call.output = output
+        return call
+
+    def _record_outcome(self, call: '_Call', error: Optional[Exception]) -> None:
+        breaker, call.breaker = call.breaker, None
+        if breaker is None:
+            return
+        if isinstance(error, QueueTimeout):
+            # The function never ran; a saturated queue says nothing about its health
+            breaker.abandon()
+        else:
+            breaker.record(error is None)
+
+    def get_breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        with self._breakers_lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+    def reset_breaker(self, function_name: str) -> bool:
+        with self._breakers_lock:
+            breaker = self._breakers.get(function_name)
+        if breaker is None:
+            return False
+        breaker.reset()
+        return True
+
+    def _get_limiter(self, function_version: Dict[str, Any]) -> Optional[_Limiter]:
+        limit = (function_version.get('metadata') or {}).get('max_concurrency')
+        if not limit:
+            return None
+        name = function_version['name']
+        with self._limiters_lock:
+            limiter = self._limiters.get(name)
+            if limiter is None or limiter.limit != int(limit):
+                # Calls holding slots of a replaced limiter release them to it
+                limiter = self._limiters[name] = _Limiter(int(limit))
+        return limiter
+
+    def _acquire_slot(self, call: '_Call') -> None:
+        """Waits for a concurrency slot, bounded by the function's queue_timeout and the call's deadline."""
+        limiter = self._get_limiter(call.function_version)
+        if limiter is None:
+            return
+        queue_timeout = (call.function_version.get('metadata') or {}).get('queue_timeout')
+        timeouts = [t for t in (queue_timeout, remaining(call.deadline)) if t is not None]
+        start = time.perf_counter()
+        acquired = limiter.acquire(max(min(timeouts), 0) if timeouts else None)
+        call.wait_time = time.perf_counter() - start
+        call.phases['queue_wait'] = call.wait_time
+        if not acquired:
+            if call.deadline is not None and remaining(call.deadline) <= 0:
+                raise FunctionTimeout(f"Function '{call.function_name}' exceeded its deadline waiting for a concurrency slot.")
+            raise QueueTimeout(f"Function '{call.function_name}' waited {call.wait_time:.2f}s for one of its "
+                               f"{limiter.limit} concurrency slots.")
+        call.limiter = limiter
+
+    def _release_slot(self, call: '_Call') -> None:
+        if call.limiter is not None:
+            call.limiter.release()
+            call.limiter = None
+
+    def get_concurrency_stats(self) -> Dict[str, Dict[str, int]]:
+        """Slots in use and callers queued for each function with a concurrency limit."""
+        with self._limiters_lock:
+            limiters = dict(self._limiters)
+        return {name: {'limit': limiter.limit, 'active': limiter.active, 'waiting': limiter.waiting}
+                for name, limiter in limiters.items()}
+
+    def get_queue_depths(self) -> Dict[str, int]:
+        """Work waiting in the executor's pools, its coalescing windows and the log buffer."""
+        def pending(pool: Optional[ThreadPoolExecutor]) -> int:
+            return pool._work_queue.qsize() if pool is not None else 0
+
+        log_writer = self.python_func.db.log_writer
+        with self._coalesce_lock:
+            coalescing = sum(len(batch['outputs']) for batch in self._coalescing.values())
+        return {
+            'trigger_pool': pending(self._trigger_pool),
+            'deferred_pool': pending(self._deferred_pool),
+            'process_pool': self._process_calls,
+            'coalescing': coalescing,
+            'log_writer': log_writer.pending() if log_writer is not None else 0,
+        }
+
+    def _is_process_function(self, function_version: Dict[str, Any]) -> bool:
+        return ((function_version.get('metadata') or {}).get('executor') == 'process'
+                and not self._is_coroutine_function(function_version))
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self._process_lock:
+            if self._process_pool is None:
+                # Workers start with every process-mode closure compiled
+                closures = []
+                for function in self.python_func.db.get_all_functions():
+                    if (function.get('metadata') or {}).get('executor') == 'process':
+                        closure = self._get_closure(function['name'])
+                        if closure:
+                            closures.append(self._worker_closure(closure))
+                initializer, initargs = process_pool.worker_initializer(closures)
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers,
+                                                         mp_context=process_pool.get_context(),
+                                                         initializer=initializer,
+                                                         initargs=initargs)
+            return self._process_pool
+
+    def _worker_closure(self, closure: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [{'name': f['name'], 'version': f['version'], 'code': f['code'],
+                 'function_imports': f['function_imports']} for f in closure]
+
+    def shutdown_process_pool(self) -> None:
+        with self._process_lock:
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _run_in_process(self, call: '_Call') -> Any:
+        """
+        Runs the function body in a worker process. Arguments and the result are
+        pickled; dependency calls made in the worker come back as child log
+        records and are written here, under this call's log.
+        """
+        closure = self._get_closure(call.function_name)
+        key = process_pool.closure_key(closure)
+        secret_keys = self.python_func.db.get_all_secret_keys()
+        pool = self._get_process_pool()
+
+        # Segment names are chosen here, so this process can unlink every
+        # segment of the call even if the worker dies while holding them
+        prefix = f"fz{os.getpid():x}_{next(self._segment_ids):x}"
+        arg_segments = []
+
+        def share(value):
+            name = f"{prefix}_{len(arg_segments)}"
+            handle = process_pool.share(value, name, self.shm_threshold)
+            if handle is not value:
+                arg_segments.append(name)
+            return handle
+
+        result_segment = f"{prefix}_r"
+        future = None
+        abandoned = False
+        with self._process_lock:
+            self._process_calls += 1
+        try:
+            args = tuple(share(arg) for arg in call.bound_args.args)
+            kwargs = {name: share(value) for name, value in call.bound_args.kwargs.items()}
+            future = pool.submit(process_pool.run_function, key, None, args, kwargs, secret_keys, result_segment,
+                                 self.shm_threshold)
+            status, value, child_logs = future.result(timeout=remaining(call.deadline))
+            if status == 'missing':
+                # The worker started before this version existed; ship the closure once
+                future = pool.submit(process_pool.run_function, key, self._worker_closure(closure), args, kwargs,
+                                     secret_keys, result_segment, self.shm_threshold)
+                status, value, child_logs = future.result(timeout=remaining(call.deadline))
+            value = process_pool.attach(value)
+        except FuturesTimeoutError:
+            # The worker finishes the call in the background; its result is discarded
+            abandoned = True
+            raise FunctionTimeout(f"Function '{call.function_name}' exceeded its deadline.") from None
+        except BrokenProcessPool:
+            # A worker died mid-call; start a fresh pool on the next call
+            with self._process_lock:
+                if self._process_pool is pool:
+                    self._process_pool = None
+            raise
+        finally:
+            with self._process_lock:
+                self._process_calls -= 1
+            segments = arg_segments + [result_segment]
+            if abandoned:
+                # The worker may still be reading the arguments and has yet to create the result segment
+                future.add_done_callback(lambda _: process_pool.unlink_all(segments))
+            else:
+                process_pool.unlink_all(segments)
+        self._write_child_logs(call.log_id, child_logs, call.span)
+        if status == 'error':
+            raise value
+        return value
+
+    def _write_child_logs(self, log_id: int, child_logs: List[Dict[str, Any]],
+                          span: Optional[Span] = None) -> None:
+        """Writes in-memory call records as child logs of `log_id`, in one batch, and as child spans of `span`."""
+        rows = []
+        for record in child_logs:
+            log_type = record.get('log_type', 'started')
+            rows.append({
+                'function_name': record['function_name'],
+                'message': self._log_message(log_type, record.get('error')),
+                'timestamp': record['timestamp'],
+                'params': record['params'],
+                'output': record.get('output'),
+                'time_spent': record.get('time_spent'),
+                'parent_log_id': log_id,
+                'parent_index': record['parent'],
+                'triggered_by_log_id': None,
+                'log_type': log_type
+            })
+        log_ids = self.python_func.db.add_logs(rows)
+        now = datetime.now()
+        for record, row, child_log_id in zip(child_logs, rows, log_ids):
+            if row['log_type'] == 'started':
+                continue
+            duration = record.get('time_spent')
+            if duration is None:
+                duration = (now - record['timestamp']).total_seconds()
+            self._record_finished(record['function_name'], row['log_type'], duration, child_log_id,
+                                  {'execute': duration}, record['timestamp'].timestamp() + duration)
+        if span is not None and self.tracer is not None:
+            self._export_record_spans(span, child_logs, log_ids)
+
+    def _export_record_spans(self, parent_span: Span, records: List[Dict[str, Any]], log_ids: List[int]) -> None:
+        spans = []
+        for record, log_id in zip(records, log_ids):
+            parent = spans[record['parent']] if record['parent'] is not None else parent_span
+            start_ns = int(record['timestamp'].timestamp() * 1e9)
+            span = self.tracer.start_span(record['function_name'], parent, {
+                'functionz.function': record['function_name'],
+                'functionz.log_id': log_id,
+                'functionz.log_type': record.get('log_type', 'started'),
+                'functionz.nested': True,
+            })
+            span.start_ns = start_ns
+            span.end_ns = start_ns + int((record.get('time_spent') or 0) * 1e9)
+            if record.get('log_type') in ('error', 'timeout'):
+                span.status, span.status_message = STATUS_ERROR, record.get('error')
+            else:
+                span.status = STATUS_OK
+            spans.append(span)
+        if spans:
+            self.tracer.export(spans)
+
+    def _start_call(self, function_name: str, args: tuple, kwargs: dict) -> '_Call':
+        executed_functions = kwargs.pop('executed_functions', None) or []
+        parent_log_id = kwargs.pop('parent_log_id', None)
+        triggered_by_log_id = kwargs.pop('triggered_by_log_id', None)
+        # A caller-set timeout in seconds, and the absolute deadline inherited from a parent call
+        execution_timeout = kwargs.pop('execution_timeout', None)
+        execution_deadline = kwargs.pop('execution_deadline', None)
+        # True or a sampling interval in seconds profiles this call; False turns off a profile set in metadata
+        execution_profile = kwargs.pop('execution_profile', None)
+        # Parent of the call's span: a Span or W3C traceparent; by default the span running in this context
+        trace_parent = kwargs.pop('trace_parent', None)
+        call = _Call(function_name, executed_functions, parent_log_id, triggered_by_log_id)
+        tracer = self.tracer
+        if tracer is not None:
+            call.span = tracer.start_span(function_name, trace_parent, {
+                'functionz.function': function_name,
+                'functionz.parent_log_id': parent_log_id,
+                'functionz.triggered_by_log_id': triggered_by_log_id,
+            })
+        mark = time.perf_counter()
 
         logger.info(f"Executing function: {function_name}")
-        logger.debug(f"Args: {args}")
-        logger.debug(f"Kwargs: {kwargs}")
+        logger.debug("Args: %s", args)
+        logger.debug("Kwargs: %s", kwargs)
         logger.debug(f"Executed functions: {executed_functions}")
 
         try:
@@ -72,98 +829,367 @@ class FunctionExecutor:
 
             executed_functions.append(function_name)
 
-            function_version = self.python_func.db.get_function(function_name)
-            if not function_version:
+            closure = self._get_closure(function_name)
+            if not closure:
                 raise ValueError(f"Function '{function_name}' not found in the database.")
+            function_version = call.function_version = closure[-1]
+            call.deadline = resolve_deadline(execution_deadline, execution_timeout,
+                                             (function_version.get('metadata') or {}).get('timeout'))
+            call.profile = profile_interval(execution_profile if execution_profile is not None
+                                            else (function_version.get('metadata') or {}).get('profile'))
+            mark = call.mark('fetch', mark)
+
+            secret_keys = self.python_func.db.get_all_secret_keys()
+            self._check_key_dependencies(function_version, secret_keys)
+            mark = call.mark('secrets', mark)
+
+            call.cache_options = self.result_cache.options(function_version)
+            if call.cache_options is not None:
+                call.cache_key, cache_params = self._result_cache_key(function_version, args, kwargs)
+            if call.cache_key is not None:
+                hit, output = self.result_cache.get(function_name, call.cache_key)
+                mark = call.mark('cache', mark)
+                if hit:
+                    # A hit is a single 'cache_hit' log row and does not fire triggers
+                    time_spent = (datetime.now() - call.start_time).total_seconds()
+                    self._add_execution_log(function_name, call.start_time, cache_params, output, time_spent,
+                                            parent_log_id, triggered_by_log_id, 'cache_hit')
+                    call.mark('log_write', mark)
+                    self._complete_call(call, 'cache_hit')
+                    call.done = True
+                    call.output = output
+                    return call
 
-            self._check_key_dependencies(function_version)
+            breaker = self._get_breaker(function_version)
+            if breaker is not None:
+                if not breaker.allow():
+                    return self._reject_call(call, breaker)
+                call.breaker = breaker
 
             # Create execution log with status 'started' and get log_id
-            log_id = self._add_execution_log(function_name, start_time, {}, None, 0,
-                                             parent_log_id, triggered_by_log_id, 'started')
+            call.log_id = self._add_execution_log(function_name, call.start_time, {}, None, 0,
+                                                  parent_log_id, triggered_by_log_id, 'started')
+            mark = call.mark('log_write', mark)
 
             # Inject parent_log_id into local_scope
-            local_scope = {'func': self.python_func, 'parent_log_id': log_id}
-            self._resolve_dependencies(function_version, local_scope, parent_log_id=log_id, executed_functions=executed_functions)
+            local_scope = {'func': self.python_func, 'parent_log_id': call.log_id}
+            call.nested = _NestedCalls(closure, secret_keys, call.deadline)
+            self._resolve_dependencies(closure, local_scope, parent_log_id=call.log_id, executed_functions=executed_functions,
+                                       nested=call.nested)
+            mark = call.mark('resolve', mark)
 
-            self._inject_secret_keys(local_scope)
+            self._inject_secret_keys(local_scope, secret_keys)
 
             logger.debug(f"Local scope before execution: {local_scope.keys()}")
 
-            exec(function_version['code'], local_scope)
+            exec(self._compile(function_version), local_scope)
             if function_name not in local_scope:
                 raise ValueError(f"Failed to load function '{function_name}'.")
+            mark = call.mark('compile', mark)
 
-            func = local_scope[function_name]
-            bound_args = self._bind_function_arguments(func, args, kwargs)
-            self._validate_input_parameters(function_version, bound_args)
+            call.func = local_scope[function_name]
+            call.bound_args = self._get_validator(function_version, call.func).bind(args, kwargs)
+            mark = call.mark('bind', mark)
 
-            params = bound_args.arguments
-            self._update_execution_log_params(log_id, params)
+            params = call.bound_args.arguments
+            self._update_execution_log_params(call.log_id, params)
+            call.mark('log_write', mark)
 
-            logger.info(f"Executing function {function_name} with args: {bound_args.args} and kwargs: {bound_args.kwargs}")
-            output = func(*bound_args.args, **bound_args.kwargs)
-            logger.info(f"Function {function_name} executed. Output: {output}")
+            logger.info("Executing function %s with args: %s and kwargs: %s", function_name, call.bound_args.args,
+                        call.bound_args.kwargs)
+            return call
+
+        except Exception as e:
+            if call.breaker is not None:
+                # Failed before the function ran, so it is not an outcome of the function
+                call.breaker.abandon()
+                call.breaker = None
+            self._fail_call(call, e)
+            raise
+
+    def _finish_call(self, call: '_Call', output: Any) -> Any:
+        function_name = call.function_name
+        try:
+            logger.info("Function %s executed. Output: %s", function_name, output)
+            mark = time.perf_counter()
+            self._flush_nested(call.nested, call.log_id, call.span)
+            mark = call.mark('log_write', mark)
 
             end_time = datetime.now()
-            time_spent = (end_time - start_time).total_seconds()
+            time_spent = (end_time - call.start_time).total_seconds()
+
+            # Update execution log with status 'success'. The phases stored with it
+            # cover the call up to this write; the write itself is only counted in phase_stats.
+            self._update_execution_log(call.log_id, output, time_spent, 'success', wait_time=call.wait_time,
+                                       phases=dict(call.phases), resources=call.resources)
+            mark = call.mark('log_write', mark)
 
-            # Update execution log with status 'success'
-            self._update_execution_log(log_id, output, time_spent, 'success')
+            if call.cache_key is not None:
+                self.result_cache.put(function_name, call.cache_key, output, call.cache_options)
+                mark = call.mark('cache', mark)
 
-            self._execute_triggered_functions(function_name, output, executed_functions, log_id)
+            defer_triggers = (call.function_version.get('metadata') or {}).get('defer_triggers', False)
+            triggered = self._execute_triggered_functions(function_name, output, call.executed_functions, call.log_id,
+                                                          defer=defer_triggers, deadline=call.deadline,
+                                                          trace_parent=call.span)
+            if triggered:
+                call.mark('triggers', mark)
+                self.python_func.db.update_log(log_id=call.log_id, phases=dict(call.phases))
 
             logger.info(f"All triggers for {function_name} have been executed.")
+            self._complete_call(call, 'success')
             return output
 
         except Exception as e:
-            end_time = datetime.now()
-            time_spent = (end_time - start_time).total_seconds()
-            params = bound_args.arguments if bound_args else {}
+            self._fail_call(call, e)
+            raise
+
+    def _complete_call(self, call: '_Call', log_type: str, error_message: Optional[str] = None) -> None:
+        """Records a finished call in the in-memory aggregates and ends its span."""
+        duration = (datetime.now() - call.start_time).total_seconds()
+        self._record_finished(call.function_name, log_type, duration, call.log_id, call.phases)
+        if call.resources is not None:
+            self.resource_stats.record(call.function_name, call.resources)
+        span, call.span = call.span, None
+        if span is not None and self.tracer is not None:
+            attributes = span.attributes
+            attributes['functionz.log_id'] = call.log_id
+            attributes['functionz.log_type'] = log_type
+            if call.function_version is not None:
+                attributes['functionz.version'] = call.function_version.get('version')
+            attributes['functionz.wait_time'] = call.wait_time
+            for phase, seconds in call.phases.items():
+                attributes[f'functionz.phase.{phase}'] = seconds
+            for name, value in (call.resources or {}).items():
+                attributes[f'functionz.{name}'] = value
+            self.tracer.end_span(span, error_message)
+
+    def _record_finished(self, function_name: str, log_type: str, duration: float, log_id: Optional[int],
+                         phases: Optional[Dict[str, float]] = None, timestamp: Optional[float] = None) -> None:
+        """Adds one finished call, however it ran, to the call stats, recent executions and phase stats."""
+        self.call_stats.record(function_name, log_type, duration)
+        self.recent.record(function_name, log_type, duration, log_id, timestamp)
+        if phases:
+            self.phase_stats.record(function_name, phases)
+
+    def _fail_call(self, call: '_Call', error: Exception) -> None:
+        end_time = datetime.now()
+        time_spent = (end_time - call.start_time).total_seconds()
+
+        # Update execution log with status 'error', or 'timeout' when the deadline passed
+        log_type = 'timeout' if isinstance(error, FunctionTimeout) else 'error'
+        if call.log_id is not None:
+            mark = time.perf_counter()
+            if log_type == 'timeout' and call.nested is not None:
+                # Nested calls still running when the caller gave up are cut off by the same deadline
+                for record in list(call.nested.records):
+                    if 'log_type' not in record:
+                        record['error'] = f"Function '{record['function_name']}' exceeded its deadline."
+                        record['log_type'] = 'timeout'
+            try:
+                self._flush_nested(call.nested, call.log_id, call.span)
+            except Exception as e:
+                logger.error(f"Failed to write nested call logs for '{call.function_name}': {str(e)}")
+            call.mark('log_write', mark)
+            self._update_execution_log(call.log_id, None, time_spent, log_type, str(error), wait_time=call.wait_time,
+                                       phases=dict(call.phases), resources=call.resources)
+        self._complete_call(call, log_type, str(error))
+
+        #logger.error(f"Error executing function '{call.function_name}': {str(error)}")
+
+    def execute_many(self, function_name: str, iterable_of_args: Iterable[Any], max_workers: Optional[int] = None,
+                     return_exceptions: bool = False, parent_log_id: Optional[int] = None) -> Iterator[Any]:
+        """
+        Runs a function over many inputs, resolving and compiling it once.
+
+        Each item is a tuple of positional arguments, a dict of keyword arguments,
+        or a single positional argument. Results are yielded in input order. The
+        batch writes one log row whose output holds a compact entry per item;
+        an item error is raised from the generator unless `return_exceptions`
+        is set, in which case the exception is yielded in its place. Functions
+        registered with metadata={"executor": "process"} are rejected.
+        """
+        start_time = datetime.now()
+        closure = self._get_closure(function_name)
+        if not closure:
+            raise ValueError(f"Function '{function_name}' not found in the database.")
+        function_version = closure[-1]
+        if self._is_process_function(function_version):
+            # Items would silently run in this process; process-mode calls go one by one through execute
+            raise ValueError(f"Function '{function_name}' runs in a worker process and cannot be batched "
+                             f"with execute_many; call execute for each item instead.")
+
+        secret_keys = self.python_func.db.get_all_secret_keys()
+        self._check_key_dependencies(function_version, secret_keys)
 
-            # Update execution log with status 'error'
-            if log_id is not None:
-                self._update_execution_log(log_id, None, time_spent, 'error', str(e))
+        # An open breaker refuses the batch up front, unless it has a fallback for each item to return
+        breaker = self._get_breaker(function_version)
+        admitted = breaker is None or breaker.allow()
+        if not admitted and not breaker.has_fallback:
+            log_id = self._add_execution_log(function_name, start_time, {}, None, 0, parent_log_id, None,
+                                             'circuit_open')
+            self._record_finished(function_name, 'circuit_open', 0.0, log_id)
+            raise CircuitOpenError(f"Circuit breaker for function '{function_name}' is {breaker.state}; "
+                                   f"batch rejected.")
 
-            #logger.error(f"Error executing function '{function_name}': {str(e)}")
+        log_id = self._add_execution_log(function_name, start_time, {}, None, 0, parent_log_id, None, 'started')
+        try:
+            executed_functions = [function_name]
+            local_scope = {'func': self.python_func, 'parent_log_id': log_id}
+            nested = _NestedCalls(closure, secret_keys)
+            self._resolve_dependencies(closure, local_scope, parent_log_id=log_id, executed_functions=executed_functions,
+                                       nested=nested)
+            self._inject_secret_keys(local_scope, secret_keys)
+            exec(self._compile(function_version), local_scope)
+            if function_name not in local_scope:
+                raise ValueError(f"Failed to load function '{function_name}'.")
+        except Exception as e:
+            if admitted and breaker is not None:
+                breaker.abandon()
+            time_spent = (datetime.now() - start_time).total_seconds()
+            self._update_execution_log(log_id, None, time_spent, 'error', str(e))
             raise
 
-    def _check_key_dependencies(self, function_version: Dict[str, Any]) -> None:
+        return self._stream_batch(function_version, local_scope[function_name], iterable_of_args, executed_functions,
+                                  log_id, start_time, max_workers, return_exceptions, nested,
+                                  breaker, [True] if admitted and breaker is not None else [])
+
+    def _stream_batch(self, function_version: Dict[str, Any], func: callable, iterable_of_args: Iterable[Any],
+                      executed_functions: List[str], log_id: int, start_time: datetime,
+                      max_workers: Optional[int], return_exceptions: bool,
+                      nested: Optional[_NestedCalls] = None, breaker: Optional[CircuitBreaker] = None,
+                      admissions: Optional[List[bool]] = None) -> Iterator[Any]:
+        function_name = function_version['name']
+        metadata = function_version.get('metadata') or {}
+
+        # Items of a batch count against the function's concurrency limit, breaker and timeout like separate calls
+        limiter = self._get_limiter(function_version)
+        queue_timeout = metadata.get('queue_timeout')
+        timeout = metadata.get('timeout')
+
+        def invoke(bound_args):
+            if limiter is not None and not limiter.acquire(queue_timeout):
+                raise QueueTimeout(f"Function '{function_name}' waited {queue_timeout}s for one of its "
+                                   f"{limiter.limit} concurrency slots.")
+            try:
+                output = func(*bound_args.args, **bound_args.kwargs)
+                if inspect.iscoroutine(output):
+                    # Coroutine functions run each item on an event loop of its own, as execute does
+                    output = asyncio.run(output)
+                return output
+            finally:
+                if limiter is not None:
+                    limiter.release()
+
+        def admit():
+            # The admission taken for the whole batch goes to its first item
+            try:
+                return admissions.pop()
+            except (AttributeError, IndexError):
+                return breaker.allow()
+
+        def run_item(index, item):
+            item_start = time.perf_counter()
+            if breaker is not None and not admit():
+                entry = {'index': index, 'status': 'circuit_open', 'time_spent': time.perf_counter() - item_start}
+                self._record_finished(function_name, 'circuit_open', entry['time_spent'], log_id)
+                if breaker.has_fallback:
+                    return True, breaker.fallback, entry
+                error = CircuitOpenError(f"Circuit breaker for function '{function_name}' is {breaker.state}; "
+                                         f"item rejected.")
+                entry['error'] = str(error)
+                return False, error, entry
+            try:
+                if isinstance(item, dict):
+                    args, kwargs = (), item
+                elif isinstance(item, tuple):
+                    args, kwargs = item, {}
+                else:
+                    args, kwargs = (item,), {}
+                bound_args = self._get_validator(function_version, func).bind(args, kwargs)
+                if timeout:
+                    output = self._run_until_deadline(function_name, resolve_deadline(None, timeout), invoke,
+                                                      bound_args)
+                else:
+                    output = invoke(bound_args)
+            except Exception as e:
+                if breaker is not None:
+                    if isinstance(e, QueueTimeout):
+                        breaker.abandon()
+                    else:
+                        breaker.record(False)
+                entry = {'index': index, 'status': 'error', 'time_spent': time.perf_counter() - item_start,
+                         'error': str(e)}
+                self._record_finished(function_name, 'timeout' if isinstance(e, FunctionTimeout) else 'error',
+                                      entry['time_spent'], log_id, {'execute': entry['time_spent']})
+                return False, e, entry
+            if breaker is not None:
+                breaker.record(True)
+            entry = {'index': index, 'status': 'success', 'time_spent': time.perf_counter() - item_start}
+            self._record_finished(function_name, 'success', entry['time_spent'], log_id,
+                                  {'execute': entry['time_spent']})
+            try:
+                self._execute_triggered_functions(function_name, output, executed_functions.copy(), log_id)
+            except Exception as e:
+                entry['status'], entry['error'] = 'error', str(e)
+                return False, e, entry
+            return True, output, entry
+
+        def results(pool):
+            items = enumerate(iterable_of_args)
+            if pool is None:
+                for index, item in items:
+                    yield run_item(index, item)
+                return
+            # A bounded window of items is in flight, so the input is read only as fast as results are taken
+            in_flight = deque(pool.submit(run_item, index, item)
+                              for index, item in itertools.islice(items, 2 * max_workers))
+            while in_flight:
+                result = in_flight.popleft().result()
+                for index, item in itertools.islice(items, 1):
+                    in_flight.append(pool.submit(run_item, index, item))
+                yield result
+
+        entries = []
+        error_message = None
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='functionz-batch') if max_workers else None
+        try:
+            for ok, value, entry in results(pool):
+                entries.append(entry)
+                if not ok and not return_exceptions:
+                    error_message = str(value)
+                    raise value
+                yield value
+        finally:
+            if pool:
+                pool.shutdown(wait=True, cancel_futures=True)
+            self._flush_nested(nested, log_id)
+            time_spent = (datetime.now() - start_time).total_seconds()
+            errors = sum(1 for entry in entries if 'error' in entry)
+            output = {'count': len(entries), 'errors': errors, 'items': entries}
+            self._update_execution_log_params(log_id, {'count': len(entries)})
+            if error_message is None:
+                self._update_execution_log(log_id, output, time_spent, 'success')
+            else:
+                self._update_execution_log(log_id, output, time_spent, 'error', error_message)
+
+    def _check_key_dependencies(self, function_version: Dict[str, Any], secret_keys: Dict[str, str]) -> None:
         if 'key_dependencies' in function_version.get('metadata', {}):
             for key_name in function_version['metadata']['key_dependencies']:
-                if key_name not in self.python_func.db.get_all_secret_keys():
+                if key_name not in secret_keys:
                     raise ValueError(f"Required secret key '{key_name}' not found for function '{function_version['name']}'")
 
-    def _inject_secret_keys(self, local_scope: Dict[str, Any]) -> None:
-        secret_keys = self.python_func.db.get_all_secret_keys()
+    def _inject_secret_keys(self, local_scope: Dict[str, Any], secret_keys: Dict[str, str]) -> None:
         if secret_keys:
             logger.debug(f"Injecting secret keys: {list(secret_keys.keys())}")
             local_scope.update(secret_keys)
 
-    def _bind_function_arguments(self, func: callable, args: tuple, kwargs: dict) -> inspect.BoundArguments:
-        sig = inspect.signature(func)
-        bound_args = sig.bind(*args, **kwargs)
-        bound_args.apply_defaults()
-        return bound_args
-
-    def _validate_input_parameters(self, function_version: Dict[str, Any], bound_args: inspect.BoundArguments) -> None:
-        input_params = function_version.get('input_parameters', [])
-        for param in input_params:
-            if param['name'] not in bound_args.arguments:
-                raise ValueError(f"Missing required input parameter '{param['name']}' for function '{function_version['name']}'")
-
     def _add_execution_log(self, function_name: str, start_time: datetime, params: Dict[str, Any],
                            output: Any, time_spent: float, parent_log_id: Optional[int],
                            triggered_by_log_id: Optional[int], log_type: str, error_message: Optional[str] = None) -> int:
-        if log_type == 'started':
-            message = "Execution started."
-        elif log_type == 'success':
-            message = "Execution successful."
-        else:
-            message = f"Execution failed. Error: {error_message}"
         return self.python_func.db.add_log(
             function_name=function_name,
-            message=message,
+            message=self._log_message(log_type, error_message),
             timestamp=start_time,
             params=params,
             output=output,
@@ -173,15 +1199,35 @@ class FunctionExecutor:
             log_type=log_type
         )
 
+    def _log_message(self, log_type: str, error_message: Optional[str] = None) -> str:
+        if log_type == 'started':
+            return "Execution started."
+        elif log_type == 'cache_hit':
+            return "Execution result served from cache."
+        elif log_type == 'success':
+            return "Execution successful."
+        elif log_type == 'circuit_open':
+            return "Circuit breaker open; call not executed."
+        elif log_type == 'timeout':
+            return f"Execution timed out. Error: {error_message}"
+        return f"Execution failed. Error: {error_message}"
+
     def _update_execution_log(self, log_id: int, output: Any, time_spent: float, log_type: str,
-          error_message: Optional[str] = None):
-        message = "Execution successful." if log_type == 'success' else f"Execution failed. Error: {error_message}"
+          error_message: Optional[str] = None, wait_time: Optional[float] = None,
+          phases: Optional[Dict[str, float]] = None, resources: Optional[Dict[str, Any]] = None):
+        message = self._log_message(log_type, error_message)
         update_data = {
             'message': message,
             'log_type': log_type
         }
         if output is not None:
             update_data['output'] = output
+        if wait_time is not None:
+            update_data['wait_time'] = wait_time
+        if phases:
+            update_data['phases'] = phases
+        if resources:
+            update_data.update(resources)
         if time_spent is not None:
             update_data['time_spent'] = time_spent
 
@@ -193,35 +1239,125 @@ class FunctionExecutor:
 
 
     
-    def _execute_triggered_functions(self, function_name: str, output: Any, executed_functions: List[str], log_id: int) -> None:
+    def _execute_triggered_functions(self, function_name: str, output: Any, executed_functions: List[str], log_id: int,
+                                     defer: bool = False, deadline: Optional[float] = None,
+                                     trace_parent: Optional[Span] = None) -> int:
+        """Runs, defers or coalesces the function's triggers and returns how many were handed off."""
         triggered_function_names = self.python_func.db.get_triggers_for_function(function_name)
         logger.info(f"Functions triggered by {function_name}: {triggered_function_names}")
 
+        pending = []
+        handled = 0
         for triggered_function_name in triggered_function_names:
             if triggered_function_name in executed_functions:
                 logger.warning(f"Triggered function '{triggered_function_name}' already executed in this chain. Skipping to prevent recursion.")
                 continue
+            handled += 1
+            coalesce_window = self._get_coalesce_window(triggered_function_name)
+            if coalesce_window:
+                self._coalesce_trigger(triggered_function_name, output, executed_functions.copy(), log_id, coalesce_window)
+                continue
+            if defer or self._is_deferred_trigger(triggered_function_name):
+                self._defer_trigger(triggered_function_name, output, executed_functions.copy(), log_id, trace_parent)
+                continue
+            pending.append(triggered_function_name)
 
-            try:
-                logger.info(f"Preparing to execute trigger: {triggered_function_name}")
-                triggered_function = self.python_func.db.get_function(triggered_function_name)
-                if triggered_function:
-                    trigger_args, trigger_kwargs = self._prepare_trigger_arguments(triggered_function, output)
-                    logger.info(f"Executing trigger {triggered_function_name} with args: {trigger_args} and kwargs: {trigger_kwargs}")
-
-                    trigger_output = self.execute(
-                        triggered_function_name,
-                        *trigger_args,
-                        executed_functions=executed_functions.copy(),
-                        parent_log_id=log_id,
-                        triggered_by_log_id=log_id,
-                        **trigger_kwargs
-                    )
-                    logger.info(f"Trigger {triggered_function_name} execution completed. Output: {trigger_output}")
-                else:
-                    logger.error(f"Triggered function '{triggered_function_name}' not found in the database.")
-            except Exception as e:
-                logger.error(f"Error executing triggered function '{triggered_function_name}': {str(e)}")
+        if len(pending) > 1 and self._can_fan_out():
+            futures = [
+                self._trigger_pool.submit(self._execute_trigger, triggered_function_name, output, executed_functions, log_id,
+                                          deadline, trace_parent)
+                for triggered_function_name in pending
+            ]
+            wait(futures)
+        else:
+            for triggered_function_name in pending:
+                self._execute_trigger(triggered_function_name, output, executed_functions, log_id, deadline, trace_parent)
+        return handled
+
+    def _get_trigger_metadata(self, triggered_function_name: str) -> Dict[str, Any]:
+        triggered_closure = self._get_closure(triggered_function_name)
+        if not triggered_closure:
+            return {}
+        return triggered_closure[-1].get('metadata') or {}
+
+    def _is_deferred_trigger(self, triggered_function_name: str) -> bool:
+        return self._get_trigger_metadata(triggered_function_name).get('trigger_mode') == 'deferred'
+
+    def _get_coalesce_window(self, triggered_function_name: str) -> float:
+        return float(self._get_trigger_metadata(triggered_function_name).get('coalesce_window') or 0)
+
+    def _coalesce_trigger(self, triggered_function_name: str, output: Any, executed_functions: List[str], log_id: int,
+                          window: float) -> None:
+        with self._coalesce_lock:
+            batch = self._coalescing.get(triggered_function_name)
+            if batch is None:
+                # The first event opens the window; lineage is taken from it
+                batch = {'outputs': [], 'executed_functions': executed_functions, 'log_id': log_id}
+                self._coalescing[triggered_function_name] = batch
+                timer = threading.Timer(window, self._flush_coalesced_trigger, args=(triggered_function_name,))
+                timer.name = f'functionz-coalesce-{triggered_function_name}'
+                timer.start()
+            if output not in batch['outputs']:
+                batch['outputs'].append(output)
+        logger.info(f"Coalescing trigger: {triggered_function_name} ({len(batch['outputs'])} pending)")
+
+    def _flush_coalesced_trigger(self, triggered_function_name: str) -> None:
+        with self._coalesce_lock:
+            batch = self._coalescing.pop(triggered_function_name, None)
+        if not batch:
+            return
+        if self._get_trigger_metadata(triggered_function_name).get('batch_trigger'):
+            # Batch-aware targets receive every distinct output in one call
+            self._execute_trigger(triggered_function_name, batch['outputs'], batch['executed_functions'], batch['log_id'])
+        else:
+            for output in batch['outputs']:
+                self._execute_trigger(triggered_function_name, output, batch['executed_functions'], batch['log_id'])
+
+    def _defer_trigger(self, triggered_function_name: str, output: Any, executed_functions: List[str], log_id: int,
+                       trace_parent: Optional[Span] = None) -> None:
+        logger.info(f"Deferring trigger: {triggered_function_name}")
+        # Deferred triggers do not inherit the deadline, but stay in the trace
+        trigger = (triggered_function_name, output, executed_functions, log_id, None, trace_parent)
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred is not None:
+            deferred.append(trigger)
+        else:
+            self._deferred_pool.submit(self._execute_trigger, *trigger)
+
+    def _can_fan_out(self) -> bool:
+        # Triggers fired from a pool thread run serially, so a bounded pool
+        # cannot deadlock waiting on its own workers
+        if self._trigger_pool is None or getattr(self._local, 'in_trigger_pool', False):
+            return False
+        # Workers would block on the SQLite write lock held by the caller's unit of work
+        return not (self.unit_of_work and self.python_func.db.log_writer is None)
+
+    def _execute_trigger(self, triggered_function_name: str, output: Any, executed_functions: List[str], log_id: int,
+                         deadline: Optional[float] = None, trace_parent: Optional[Span] = None) -> None:
+        try:
+            logger.info(f"Preparing to execute trigger: {triggered_function_name}")
+            triggered_closure = self._get_closure(triggered_function_name)
+            if triggered_closure:
+                triggered_function = triggered_closure[-1]
+                trigger_args, trigger_kwargs = self._prepare_trigger_arguments(triggered_function, output)
+                logger.info("Executing trigger %s with args: %s and kwargs: %s", triggered_function_name, trigger_args,
+                            trigger_kwargs)
+
+                trigger_output = self.execute(
+                    triggered_function_name,
+                    *trigger_args,
+                    executed_functions=executed_functions.copy(),
+                    parent_log_id=log_id,
+                    triggered_by_log_id=log_id,
+                    execution_deadline=deadline,
+                    trace_parent=trace_parent,
+                    **trigger_kwargs
+                )
+                logger.info("Trigger %s execution completed. Output: %s", triggered_function_name, trigger_output)
+            else:
+                logger.error(f"Triggered function '{triggered_function_name}' not found in the database.")
+        except Exception as e:
+            logger.error(f"Error executing triggered function '{triggered_function_name}': {str(e)}")
 
     def _prepare_trigger_arguments(self, triggered_function: Dict[str, Any], output: Any) -> tuple:
         triggered_params = triggered_function.get('input_parameters', [])
@@ -9,20 +9,33 @@ import logging
 
 from ..db.db_router import DBRouter
 from .execution import FunctionExecutor
+from .tracing import SpanExporter
 from .registration import FunctionRegistrar
 
 logger = logging.getLogger(__name__)
 
 class Functionz:
-    def __init__(self, db_type='local', **db_kwargs):
+    def __init__(self, db_type='local', unit_of_work: bool = False, trigger_workers: int = 0,
+                 deferred_workers: int = 1, process_workers: Optional[int] = None, recent_executions: int = 1024,
+                 **db_kwargs):
         self.db = DBRouter(db_type, **db_kwargs)
-        self.executor = FunctionExecutor(self)
+        self.executor = FunctionExecutor(self, unit_of_work=unit_of_work, trigger_workers=trigger_workers,
+                                         deferred_workers=deferred_workers, process_workers=process_workers,
+                                         recent_executions=recent_executions)
         self.registrar = FunctionRegistrar(self)
 
     # Function execution
     def execute_function(self, function_name: str, *args, **kwargs):
         return self.executor.execute(function_name, *args, **kwargs)
 
+    async def execute_async(self, function_name: str, *args, **kwargs):
+        return await self.executor.execute_async(function_name, *args, **kwargs)
+
+    def execute_many(self, function_name: str, iterable_of_args, max_workers: Optional[int] = None,
+                     return_exceptions: bool = False):
+        return self.executor.execute_many(function_name, iterable_of_args, max_workers=max_workers,
+                                          return_exceptions=return_exceptions)
+
     def __getattr__(self, name):
         if self.db.get_function(name):
             return lambda *args, **kwargs: self.executor.execute(name, *args, **kwargs)
@@ -44,6 +57,13 @@ class Functionz:
     def get_function_imports(self, name: str):
         return self.db.get_function_imports(name)
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {
+            'code': self.executor.code_cache.stats(),
+            'closure': self.executor.closure_cache.stats(),
+            'result': self.executor.result_cache.stats()
+        }
+
     # Function registration (exposing registrar methods)
     def register_function(self, *args, **kwargs):
         return self.registrar.register_function(*args, **kwargs)
@@ -108,6 +128,9 @@ class Functionz:
     def add_trigger(self, triggered_function_name, triggering_function_name=None):
         self.db.add_trigger(triggered_function_name, triggering_function_name)
 
+    def set_trigger_workers(self, max_workers: int) -> None:
+        self.executor.set_trigger_workers(max_workers)
+
     def get_triggers_for_function(self, function_name: str) -> List[str]:
         function_data = self.get_function(function_name)
         return function_data.get('triggers', []) if function_data else []
@@ -118,6 +141,38 @@ class Functionz:
                  end_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
         return self.db.get_logs(function_name, start_date, end_date)
 
+    def get_concurrency_stats(self) -> Dict[str, Dict[str, int]]:
+        return self.executor.get_concurrency_stats()
+
+    def get_breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        return self.executor.get_breaker_states()
+
+    def reset_breaker(self, function_name: str) -> bool:
+        return self.executor.reset_breaker(function_name)
+
+    def get_phase_stats(self, function_name: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return self.executor.phase_stats.snapshot(function_name)
+
+    def get_resource_stats(self, function_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        return self.executor.resource_stats.snapshot(function_name)
+
+    def get_recent_executions(self, function_name: Optional[str] = None,
+                              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.executor.recent.recent(function_name, limit)
+
+    def get_latency_percentiles(self, function_name: Optional[str] = None,
+                                window: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        return self.executor.recent.percentiles(function_name, window)
+
+    def set_span_exporter(self, exporter: Optional[SpanExporter]) -> None:
+        self.executor.set_span_exporter(exporter)
+
+    def enable_log_buffer(self, **kwargs) -> None:
+        self.db.enable_log_buffer(**kwargs)
+
+    def flush_logs(self) -> None:
+        self.db.flush_logs()
+
     def display(self):
         functions = self.db.get_all_functions()
         result = []
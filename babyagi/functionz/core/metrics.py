@@ -0,0 +1,388 @@
+# core/metrics.py
+
+import math
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Phases an execution's time is split into; log_write accumulates every log write of the call
+PHASES = ('fetch', 'secrets', 'cache', 'log_write', 'resolve', 'compile', 'bind', 'queue_wait', 'execute',
+          'triggers')
+
+
+class PhaseStats:
+    """In-memory per-function aggregates of execution phase timings (count, total and max seconds)."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, list]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, function_name: str, phases: Dict[str, float]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(function_name, {})
+            for phase, seconds in phases.items():
+                entry = stats.get(phase)
+                if entry is None:
+                    stats[phase] = [1, seconds, seconds]
+                else:
+                    entry[0] += 1
+                    entry[1] += seconds
+                    if seconds > entry[2]:
+                        entry[2] = seconds
+
+    def snapshot(self, function_name: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            names = [function_name] if function_name else list(self._stats)
+            return {
+                name: {
+                    phase: {'count': count, 'total': total, 'mean': total / count, 'max': peak}
+                    for phase, (count, total, peak) in self._stats.get(name, {}).items()
+                }
+                for name in names
+                if name in self._stats
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+class ResourceTracker:
+    """
+    Measures one execution of a function registered with
+    metadata={"track_resources": True}: CPU seconds of the thread running
+    the body, the peak of memory traced by tracemalloc above its level at the
+    start, and the net number of memory blocks allocated. A coroutine body is
+    measured on the event loop's thread, so other tasks interleaved with it
+    count too.
+
+    tracemalloc is started by the first tracked call in flight and stopped
+    when the last one ends. While it runs it traces every allocation in every
+    thread of the process, so untracked calls running at the same time are
+    slowed down as well. Tracked calls running at the same time share one
+    traced peak.
+    """
+
+    __slots__ = ('_cpu', '_blocks', '_base')
+
+    def start(self) -> 'ResourceTracker':
+        global _tracing_users, _tracing_started
+        with _tracing_lock:
+            if _tracing_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing_started = True
+            _tracing_users += 1
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._blocks = sys.getallocatedblocks()
+        self._cpu = time.thread_time()
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        global _tracing_users, _tracing_started
+        cpu_time = time.thread_time() - self._cpu
+        allocated_blocks = sys.getallocatedblocks() - self._blocks
+        with _tracing_lock:
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else self._base
+            _tracing_users -= 1
+            if _tracing_users == 0 and _tracing_started:
+                tracemalloc.stop()
+                _tracing_started = False
+        return {'cpu_time': cpu_time, 'peak_memory': max(peak - self._base, 0), 'allocated_blocks': allocated_blocks}
+
+
+class ResourceStats:
+    """In-memory per-function totals of tracked resource usage, for capacity planning."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, function_name: str, usage: Dict[str, Any]) -> None:
+        with self._lock:
+            stats = self._stats.get(function_name)
+            if stats is None:
+                stats = self._stats[function_name] = {'count': 0, 'cpu_time': 0.0, 'max_cpu_time': 0.0,
+                                                      'peak_memory': 0, 'allocated_blocks': 0}
+            stats['count'] += 1
+            stats['cpu_time'] += usage['cpu_time']
+            stats['max_cpu_time'] = max(stats['max_cpu_time'], usage['cpu_time'])
+            stats['peak_memory'] = max(stats['peak_memory'], usage['peak_memory'])
+            stats['allocated_blocks'] += usage['allocated_blocks']
+
+    def snapshot(self, function_name: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            names = [function_name] if function_name else list(self._stats)
+            return {
+                name: dict(self._stats[name], mean_cpu_time=self._stats[name]['cpu_time'] / self._stats[name]['count'])
+                for name in names
+                if name in self._stats
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram; callers hold the lock of the stats object owning it."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+
+    def cumulative(self) -> list:
+        """(upper bound, count of observations <= bound) pairs, ending with +Inf."""
+        pairs, running = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            pairs.append((bound, running))
+        pairs.append((float('inf'), self.count))
+        return pairs
+
+
+class CallStats:
+    """In-memory per-function call counts by outcome (log_type) and latency histograms."""
+
+    ERROR_TYPES = ('error', 'timeout')
+
+    def __init__(self):
+        self._calls: Dict[str, Dict[str, int]] = {}
+        self._latency: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, function_name: str, log_type: str, seconds: float) -> None:
+        with self._lock:
+            calls = self._calls.get(function_name)
+            if calls is None:
+                calls = self._calls[function_name] = {}
+                self._latency[function_name] = Histogram()
+            calls[log_type] = calls.get(log_type, 0) + 1
+            self._latency[function_name].observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    'calls': dict(calls),
+                    'errors': sum(calls.get(log_type, 0) for log_type in self.ERROR_TYPES),
+                    'latency': self._latency[name].cumulative(),
+                    'latency_sum': self._latency[name].sum,
+                    'latency_count': self._latency[name].count,
+                }
+                for name, calls in self._calls.items()
+            }
+
+
+class QueryStats:
+    """Database statement timings by statement type (SELECT, INSERT, ...), fed by engine events."""
+
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault('functionz_query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        starts = conn.info.get('functionz_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+        with self._lock:
+            histogram = self._histograms.get(kind)
+            if histogram is None:
+                histogram = self._histograms[kind] = Histogram(self.BUCKETS)
+            histogram.observe(elapsed)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {kind: {'latency': h.cumulative(), 'sum': h.sum, 'count': h.count}
+                    for kind, h in self._histograms.items()}
+
+
+def _label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _bound(value: float) -> str:
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+def render_prometheus(functionz) -> str:
+    """Prometheus text exposition (format 0.0.4) of a Functionz instance's in-memory aggregates."""
+    executor = functionz.executor
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def histogram(name: str, labels: str, buckets: list, total: float, count: int) -> None:
+        for bound, cumulative in buckets:
+            lines.append(f'{name}_bucket{{{labels},le="{_bound(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {total}")
+        lines.append(f"{name}_count{{{labels}}} {count}")
+
+    calls = executor.call_stats.snapshot()
+    metric('functionz_calls_total', 'counter', 'Function executions by outcome.')
+    for name, stats in calls.items():
+        for status, count in stats['calls'].items():
+            lines.append(f'functionz_calls_total{{function="{_label(name)}",status="{_label(status)}"}} {count}')
+    metric('functionz_errors_total', 'counter', 'Function executions that failed or timed out.')
+    for name, stats in calls.items():
+        lines.append(f'functionz_errors_total{{function="{_label(name)}"}} {stats["errors"]}')
+    metric('functionz_call_duration_seconds', 'histogram', 'Wall-clock duration of function executions.')
+    for name, stats in calls.items():
+        histogram('functionz_call_duration_seconds', f'function="{_label(name)}"', stats['latency'],
+                  stats['latency_sum'], stats['latency_count'])
+
+    metric('functionz_phase_seconds_total', 'counter', 'Seconds spent in each execution phase.')
+    for name, phases in executor.phase_stats.snapshot().items():
+        for phase, stats in phases.items():
+            lines.append(f'functionz_phase_seconds_total{{function="{_label(name)}",phase="{phase}"}} {stats["total"]}')
+
+    concurrency = executor.get_concurrency_stats()
+    metric('functionz_concurrency_active', 'gauge', 'Concurrency slots in use per limited function.')
+    for name, stats in concurrency.items():
+        lines.append(f'functionz_concurrency_active{{function="{_label(name)}"}} {stats["active"]}')
+    metric('functionz_concurrency_waiting', 'gauge', 'Calls queued for a concurrency slot per limited function.')
+    for name, stats in concurrency.items():
+        lines.append(f'functionz_concurrency_waiting{{function="{_label(name)}"}} {stats["waiting"]}')
+    metric('functionz_queue_depth', 'gauge', 'Work waiting in executor queues.')
+    for queue_name, depth in executor.get_queue_depths().items():
+        lines.append(f'functionz_queue_depth{{queue="{queue_name}"}} {depth}')
+
+    caches = functionz.get_cache_stats()
+    metric('functionz_cache_hits_total', 'counter', 'Cache hits.')
+    for cache, stats in caches.items():
+        lines.append(f'functionz_cache_hits_total{{cache="{cache}"}} {stats["hits"]}')
+    metric('functionz_cache_misses_total', 'counter', 'Cache misses.')
+    for cache, stats in caches.items():
+        lines.append(f'functionz_cache_misses_total{{cache="{cache}"}} {stats["misses"]}')
+    metric('functionz_cache_hit_ratio', 'gauge', 'Cache hits over lookups since start.')
+    for cache, stats in caches.items():
+        lookups = stats['hits'] + stats['misses']
+        lines.append(f'functionz_cache_hit_ratio{{cache="{cache}"}} {stats["hits"] / lookups if lookups else 0.0}')
+
+    metric('functionz_circuit_breaker_open', 'gauge', 'Whether a function\'s circuit breaker is open (1) or not (0).')
+    for name, state in executor.get_breaker_states().items():
+        lines.append(f'functionz_circuit_breaker_open{{function="{_label(name)}"}} {int(state["state"] == "open")}')
+
+    metric('functionz_db_query_duration_seconds', 'histogram', 'Database statement durations by statement type.')
+    for kind, stats in functionz.db.db.query_stats.snapshot().items():
+        histogram('functionz_db_query_duration_seconds', f'statement="{_label(kind)}"', stats['latency'],
+                  stats['sum'], stats['count'])
+    return '\n'.join(lines) + '\n'
+
+
+class ExecutionSummary:
+    """One finished execution as kept in the ExecutionRing; slots are overwritten in place."""
+
+    __slots__ = ('function_name', 'status', 'duration', 'timestamp', 'log_id')
+
+    def __init__(self):
+        self.function_name = None
+        self.status = None
+        self.duration = 0.0
+        self.timestamp = 0.0
+        self.log_id = None
+
+
+class ExecutionRing:
+    """
+    The last `capacity` finished executions, in a fixed array of summary
+    records allocated up front. Recording overwrites the oldest slot, so the
+    buffer never grows and recent activity and latency percentiles can be
+    read without touching the database.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._slots = [ExecutionSummary() for _ in range(capacity)]
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def record(self, function_name: str, status: str, duration: float, log_id: Optional[int],
+               timestamp: Optional[float] = None) -> None:
+        with self._lock:
+            slot = self._slots[self._next]
+            slot.function_name = function_name
+            slot.status = status
+            slot.duration = duration
+            slot.timestamp = timestamp if timestamp is not None else time.time()
+            slot.log_id = log_id
+            self._next = (self._next + 1) % self.capacity
+            if self._size < self.capacity:
+                self._size += 1
+
+    def _newest_first(self, function_name: Optional[str], since: Optional[float]) -> list:
+        """Copies of matching summaries as (function, status, duration, timestamp, log_id), newest first."""
+        rows = []
+        with self._lock:
+            index = self._next
+            for _ in range(self._size):
+                index = (index - 1) % self.capacity
+                slot = self._slots[index]
+                if since is not None and slot.timestamp < since:
+                    break
+                if function_name is None or slot.function_name == function_name:
+                    rows.append((slot.function_name, slot.status, slot.duration, slot.timestamp, slot.log_id))
+        return rows
+
+    def recent(self, function_name: Optional[str] = None, limit: Optional[int] = None) -> list:
+        rows = self._newest_first(function_name, None)[:limit]
+        return [{'function_name': name, 'status': status, 'duration': duration,
+                 'timestamp': datetime.fromtimestamp(timestamp).isoformat(), 'log_id': log_id}
+                for name, status, duration, timestamp, log_id in rows]
+
+    def percentiles(self, function_name: Optional[str] = None, window: Optional[float] = None,
+                    quantiles: tuple = (0.5, 0.9, 0.95, 0.99)) -> Dict[str, Dict[str, Any]]:
+        """Per-function duration percentiles (nearest rank) over the buffer, or its last `window` seconds."""
+        since = time.time() - window if window else None
+        durations: Dict[str, list] = {}
+        for name, _, duration, _, _ in self._newest_first(function_name, since):
+            durations.setdefault(name, []).append(duration)
+        result = {}
+        for name, values in durations.items():
+            values.sort()
+            stats = {'count': len(values), 'max': values[-1]}
+            for q in quantiles:
+                stats[f"p{q * 100:g}"] = values[max(math.ceil(q * len(values)) - 1, 0)]
+            result[name] = stats
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._next = 0
+            self._size = 0
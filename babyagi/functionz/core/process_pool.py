@@ -0,0 +1,334 @@
+# core/process_pool.py
+
+"""
+Worker side of the process execution mode.
+
+Functions registered with metadata={"executor": "process"} run in a warm
+ProcessPoolExecutor. Workers keep compiled closures keyed by the
+(name, version) pairs of the function and its dependencies, so steady-state
+calls only ship that key, the arguments and the secrets. Workers never touch
+the database: dependency calls are recorded as in-memory child logs and
+returned with the result for the parent to write.
+
+Large buffer-protocol arguments and results (bytes, bytearray, memoryview,
+array.array, NumPy arrays) travel through multiprocessing.shared_memory
+segments instead of the pickle pipe; only a SharedBuffer handle is pickled.
+
+Workers start from a fresh interpreter (forkserver, or spawn where that is
+unavailable) and load this file on its own, under WORKER_MODULE, so they never
+import the babyagi package. As with any such pool, the main module of the
+parent is imported again in workers and should keep its entry code under
+`if __name__ == '__main__':`.
+"""
+
+import array
+import importlib
+import inspect
+import json
+import multiprocessing
+import sys
+import time
+import weakref
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+# Buffers at least this large (in bytes) go through shared memory
+SHM_THRESHOLD = 1 << 20
+
+# Per-worker caches, filled by the pool initializer and on demand
+_closures: Dict[tuple, List[Dict[str, Any]]] = {}
+_compiled: Dict[tuple, Any] = {}
+
+# Set in pool workers. The parent owns and unlinks every segment of a call,
+# so workers keep them out of the resource tracker, which would otherwise
+# report them as leaked and unlink them again when it exits.
+_in_worker = False
+
+# The name workers load this file under. Imported as
+# babyagi.functionz.core.process_pool, it would first run the babyagi package
+# __init__, which opens the default database and registers the default packs.
+WORKER_MODULE = 'functionz_process_worker'
+
+_BOOTSTRAP = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location(name, path)
+module = sys.modules[name] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+module.init_worker(closures)
+"""
+
+
+def closure_key(closure: List[Dict[str, Any]]) -> tuple:
+    return tuple((f['name'], f['version']) for f in closure)
+
+
+def get_context():
+    # Never fork: the parent runs threads (log writer, web server, callers)
+    # whose locks a forked worker could inherit in a held state
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def worker_initializer(closures: List[List[Dict[str, Any]]]) -> Tuple[Any, tuple]:
+    """
+    Pool initializer and initargs that load this file in the worker by path,
+    then run init_worker. Only builtins are pickled to get there.
+    """
+    return exec, (_BOOTSTRAP, {'name': WORKER_MODULE, 'path': __file__, 'closures': closures})
+
+
+def init_worker(closures: List[List[Dict[str, Any]]]) -> None:
+    global _in_worker
+    _in_worker = True
+    for closure in closures:
+        _load_closure(closure)
+
+
+def _load_closure(closure: List[Dict[str, Any]]) -> None:
+    for function_version in closure:
+        key = (function_version['name'], function_version['version'])
+        if key not in _compiled:
+            _compiled[key] = compile(function_version['code'],
+                                     f"<functionz:{key[0]}@v{key[1]}>", 'exec')
+    _closures[closure_key(closure)] = closure
+
+
+class SharedBuffer:
+    """Picklable handle to a buffer stored in a named shared memory segment."""
+
+    __slots__ = ('name', 'nbytes', 'kind', 'typecode', 'shape')
+
+    def __init__(self, name: str, nbytes: int, kind: str, typecode: Optional[str] = None,
+                 shape: Optional[tuple] = None):
+        self.name = name
+        self.nbytes = nbytes
+        self.kind = kind
+        self.typecode = typecode
+        self.shape = shape
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+
+def _buffer_kind(value: Any) -> Optional[str]:
+    if isinstance(value, (bytes, bytearray, memoryview, array.array)):
+        return type(value).__name__
+    # Checked by module name so NumPy is only imported when it is already in use
+    if type(value).__module__ == 'numpy' and type(value).__name__ == 'ndarray' and not value.dtype.hasobject:
+        return 'ndarray'
+    return None
+
+
+def share(value: Any, name: str, threshold: int) -> Any:
+    """Copies a large buffer into a new segment called `name` and returns its handle; other values pass through."""
+    kind = _buffer_kind(value)
+    if kind is None or not threshold:
+        return value
+    if kind != 'ndarray' and not memoryview(value).c_contiguous:
+        return value
+    nbytes = value.nbytes if kind == 'ndarray' else memoryview(value).nbytes
+    if nbytes < threshold:
+        return value
+
+    segment = _open_segment(name, create=True, size=nbytes)
+    try:
+        if kind == 'ndarray':
+            import numpy
+            view = numpy.ndarray(value.shape, dtype=value.dtype, buffer=segment.buf)
+            view[...] = value
+            del view
+            handle = SharedBuffer(name, nbytes, kind, value.dtype.str, value.shape)
+        else:
+            view = memoryview(value)
+            segment.buf[:nbytes] = view.cast('B')
+            if kind == 'array':
+                handle = SharedBuffer(name, nbytes, kind, value.typecode)
+            else:
+                handle = SharedBuffer(name, nbytes, kind, view.format, view.shape)
+            view.release()
+    finally:
+        segment.close()
+    return handle
+
+
+def attach(handle: Any, held: Optional[List[tuple]] = None) -> Any:
+    """
+    Rebuilds the value behind a handle; other values pass through.
+
+    NumPy arrays are views of the segment, which stays mapped until the array
+    is garbage collected. When `held` is given, memoryviews are views too and
+    their mappings are appended to it for the caller to release with
+    release(). Everything else is copied out and the mapping closed at once.
+    """
+    if not isinstance(handle, SharedBuffer):
+        return handle
+    segment = _open_segment(handle.name)
+    buf = segment.buf[:handle.nbytes]
+    if handle.kind == 'ndarray':
+        import numpy
+        value = numpy.ndarray(handle.shape, dtype=numpy.dtype(handle.typecode), buffer=buf)
+        weakref.finalize(value, _close_segment, segment, buf)
+        return value
+    if handle.kind == 'memoryview' and held is not None:
+        held.append((segment, buf))
+        return buf.cast(handle.typecode, handle.shape)
+
+    if handle.kind == 'array':
+        value = array.array(handle.typecode)
+        value.frombytes(buf)
+    elif handle.kind == 'bytearray':
+        value = bytearray(buf)
+    elif handle.kind == 'memoryview':
+        value = memoryview(bytes(buf)).cast(handle.typecode, handle.shape)
+    else:
+        value = bytes(buf)
+    _close_segment(segment, buf)
+    return value
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if _in_worker:
+        # Python < 3.13 registers every segment it opens, with no way to opt out
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def release(held: List[tuple]) -> None:
+    for segment, buf in held:
+        _close_segment(segment, buf)
+    held.clear()
+
+
+# Mappings that could not be closed because user code kept a view of them
+_pinned: List[shared_memory.SharedMemory] = []
+
+
+def _close_segment(segment: shared_memory.SharedMemory, buf: memoryview) -> None:
+    try:
+        buf.release()
+        segment.close()
+    except BufferError:
+        _pinned.append(segment)
+
+
+def unlink_all(names: List[str]) -> None:
+    for name in names:
+        unlink(name)
+
+
+def unlink(name: str) -> bool:
+    """Removes a segment by name; returns False if it did not exist."""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    segment.unlink()
+    return True
+
+
+def run_function(key: tuple, closure: Optional[List[Dict[str, Any]]], args: tuple, kwargs: dict,
+                 secret_keys: Dict[str, str], result_segment: Optional[str] = None,
+                 threshold: int = SHM_THRESHOLD) -> Tuple[str, Any, List[Dict[str, Any]]]:
+    """
+    Runs the root function of a closure in this worker.
+
+    Returns ('missing', None, []) when the closure is not loaded and was not
+    sent, ('success', output, child_logs) or ('error', exception, child_logs).
+    A large output is moved into a segment named `result_segment`, which the
+    caller owns and unlinks, also when it stopped waiting for the result.
+    """
+    if closure is not None:
+        _load_closure(closure)
+    closure = _closures.get(key)
+    if closure is None:
+        return 'missing', None, []
+
+    child_logs: List[Dict[str, Any]] = []
+    stack: List[int] = []
+    scope: Dict[str, Any] = {}
+    held: List[tuple] = []
+    try:
+        args = tuple(attach(arg, held) for arg in args)
+        kwargs = {name: attach(value, held) for name, value in kwargs.items()}
+        for function_version in closure:
+            for imp in function_version['function_imports']:
+                if imp['name'] not in scope:
+                    scope[imp['name']] = importlib.import_module(imp['name'])
+
+        for function_version in closure[:-1]:
+            name = function_version['name']
+            if name in scope:
+                continue
+            exec(_compiled[(name, function_version['version'])], scope)
+            if name in scope:
+                scope[name] = _record_calls(scope[name], name, child_logs, stack)
+
+        scope.update(secret_keys)
+        root = closure[-1]
+        exec(_compiled[(root['name'], root['version'])], scope)
+        output = scope[root['name']](*args, **kwargs)
+        if result_segment is not None:
+            output = share(output, result_segment, threshold)
+        return 'success', output, child_logs
+    except Exception as e:
+        return 'error', e, child_logs
+    finally:
+        release(held)
+
+
+def _record_calls(func, name: str, child_logs: List[Dict[str, Any]], stack: List[int]):
+    """Wraps a dependency so each call is recorded as a child log entry."""
+    def wrapper(*args, **kwargs):
+        try:
+            params = inspect.signature(func).bind(*args, **kwargs).arguments
+        except TypeError:
+            params = {}
+        record = {
+            'function_name': name,
+            'timestamp': datetime.now(),
+            'params': {k: _loggable(v) for k, v in params.items()},
+            'parent': stack[-1] if stack else None,
+        }
+        child_logs.append(record)
+        stack.append(len(child_logs) - 1)
+        start = time.perf_counter()
+        try:
+            output = func(*args, **kwargs)
+            record['log_type'] = 'success'
+            record['output'] = _loggable(output)
+            return output
+        except Exception as e:
+            record['log_type'] = 'error'
+            record['error'] = str(e)
+            raise
+        finally:
+            record['time_spent'] = time.perf_counter() - start
+            stack.pop()
+    return wrapper
+
+
+def _loggable(value: Any) -> Any:
+    # Child logs travel back through pickle and end up in JSON columns; buffers are summarized as the
+    # logs table does, rather than repr'd in full
+    kind = _buffer_kind(value)
+    if kind is not None:
+        nbytes = value.nbytes if kind == 'ndarray' else memoryview(value).nbytes
+        return f"<{kind}: {nbytes} bytes>"
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+# Handles and the task function are pickled under WORKER_MODULE, the name
+# workers know this file by; the parent resolves that name to this module too
+sys.modules.setdefault(WORKER_MODULE, sys.modules[__name__])
+SharedBuffer.__module__ = run_function.__module__ = WORKER_MODULE
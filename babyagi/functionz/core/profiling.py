@@ -0,0 +1,143 @@
+# core/profiling.py
+
+import os
+import sys
+import threading
+import zlib
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Any, Dict, Optional
+from xml.sax.saxutils import escape
+
+DEFAULT_INTERVAL = 0.005
+
+
+def profile_interval(option: Any) -> Optional[float]:
+    """Sampling interval for a `profile` call argument or metadata value: True, seconds, or {"interval": s}."""
+    if not option:
+        return None
+    if isinstance(option, dict):
+        return float(option.get('interval') or DEFAULT_INTERVAL)
+    if option is True:
+        return DEFAULT_INTERVAL
+    return float(option)
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack on a background thread while it runs a
+    call, counting identical stacks. Frames at and above `stop_frame` (the
+    executor's own frames) are left out, so stacks start at the function.
+
+    The result is in collapsed-stack format, one "frame;frame;frame count"
+    line per distinct stack, as read by flamegraph.pl, speedscope and
+    render_flamegraph below.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_id: Optional[int] = None,
+                 stop_frame: Optional[FrameType] = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples = 0
+        self._stop_frame = stop_frame
+        self._counts: Counter = Counter()
+        self._labels: Dict[CodeType, str] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='functionz-profiler', daemon=True)
+
+    def start(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        self._stopped.set()
+        self._thread.join()
+        self._stop_frame = None
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in sorted(self._counts.items()))
+
+    def _run(self) -> None:
+        stop_code = StackSampler.stop.__code__
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            outermost = None
+            while frame is not None and frame is not self._stop_frame:
+                stack.append(self._label(frame.f_code))
+                outermost = frame.f_code
+                frame = frame.f_back
+            # A sample taken while the sampled thread is stopping the sampler
+            if outermost is stop_code:
+                break
+            if stack:
+                self._counts[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # ';' separates frames and a line holds one stack, so neither may appear in a label;
+            # co_qualname is new in Python 3.11
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            label = self._labels[code] = label.replace(';', ':').replace('\n', ' ')
+        return label
+
+
+def _color(name: str) -> str:
+    # Warm palette, stable per frame name
+    h = zlib.crc32(name.encode())
+    return f"rgb({205 + h % 50},{(h >> 8) % 180},{(h >> 16) % 55})"
+
+
+def render_flamegraph(collapsed: str, title: str = 'Flame graph', width: int = 1200, frame_height: int = 16) -> str:
+    """Renders collapsed stacks as a standalone SVG flame graph."""
+    root: Dict[str, Any] = {'value': 0, 'children': {}}
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if not stack:
+            continue
+        samples = int(count)
+        node = root
+        node['value'] += samples
+        for name in stack.split(';'):
+            node = node['children'].setdefault(name, {'value': 0, 'children': {}})
+            node['value'] += samples
+
+    def depth(node: Dict[str, Any]) -> int:
+        return 1 + max((depth(child) for child in node['children'].values()), default=0)
+
+    total = root['value'] or 1
+    top = 3 * frame_height
+    height = top + depth(root) * frame_height + frame_height
+    scale = (width - 20) / total
+    rects = []
+
+    def layout(name: str, node: Dict[str, Any], x: float, level: int) -> None:
+        w = node['value'] * scale
+        if w < 0.5:
+            return
+        y = height - frame_height - (level + 1) * frame_height
+        label = escape(name)
+        tooltip = f"{label} ({node['value']} samples, {100.0 * node['value'] / total:.2f}%)"
+        text = ''
+        chars = int(w / 7)
+        if chars >= 3:
+            shown = name if len(name) <= chars else name[:chars - 2] + '..'
+            text = f'<text x="{x + 3:.1f}" y="{y + frame_height - 4}">{escape(shown)}</text>'
+        rects.append(f'<g><title>{tooltip}</title><rect x="{x:.1f}" y="{y}" width="{w:.1f}" '
+                     f'height="{frame_height - 1}" fill="{_color(name)}" rx="2"/>{text}</g>')
+        for child_name, child in node['children'].items():
+            layout(child_name, child, x, level + 1)
+            x += child['value'] * scale
+
+    layout('all', root, 10.0, 0)
+    return (f'<?xml version="1.0" standalone="no"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'font-family="Verdana, sans-serif" font-size="11">\n'
+            f'<rect width="100%" height="100%" fill="#fdfdf5"/>\n'
+            f'<text x="{width / 2}" y="{2 * frame_height}" text-anchor="middle" font-size="15">{escape(title)}</text>\n'
+            + '\n'.join(rects) + '\n</svg>\n')
+
@@ -22,7 +22,7 @@ class FunctionRegistrar:
         def decorator(func):
             function_name = func.__name__
             source_lines = inspect.getsourcelines(func)[0]
-            func_start = next(i for i, line in enumerate(source_lines) if line.strip().startswith('def '))
+            func_start = next(i for i, line in enumerate(source_lines) if line.strip().startswith(('def ', 'async def ')))
             function_code = ''.join(source_lines[func_start:]).strip()
 
             # Store metadata on the function object
@@ -51,7 +51,7 @@ class FunctionRegistrar:
             tree = ast.parse(code)
 
             # Find the function definition node
-            function_def = next(node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef))
+            function_def = next(node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)))
 
             # Parse input parameters
             input_params = []
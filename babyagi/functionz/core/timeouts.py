@@ -0,0 +1,25 @@
+# core/timeouts.py
+
+import time
+from typing import Optional
+
+
+class FunctionTimeout(TimeoutError):
+    """Raised when a call runs past its deadline."""
+
+
+class QueueTimeout(FunctionTimeout):
+    """Raised when a call waits too long for a concurrency slot."""
+
+
+def resolve_deadline(inherited: Optional[float], *timeouts: Optional[float]) -> Optional[float]:
+    """The earliest of an inherited monotonic deadline and now + each timeout given in seconds."""
+    now = time.monotonic()
+    candidates = [now + float(timeout) for timeout in timeouts if timeout]
+    if inherited is not None:
+        candidates.append(inherited)
+    return min(candidates) if candidates else None
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else deadline - time.monotonic()
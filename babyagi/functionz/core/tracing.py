@@ -0,0 +1,196 @@
+# core/tracing.py
+
+import json
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Span of the function body running in the current thread or task
+_current_span: ContextVar[Optional['Span']] = ContextVar('functionz_current_span', default=None)
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """One traced execution, with W3C trace-context ids (hex strings)."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_span_id', 'start_ns', 'end_ns', 'attributes', 'status',
+                 'status_message')
+
+    def __init__(self, name: str, trace_id: str, span_id: str, parent_span_id: Optional[str] = None,
+                 start_ns: Optional[int] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_span_id = parent_span_id
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes if attributes is not None else {}
+        self.status = STATUS_UNSET
+        self.status_message = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns if self.end_ns is not None else self.start_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in self.attributes.items()
+                           if value is not None],
+            'status': {'code': self.status},
+        }
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        if self.status_message:
+            span['status']['message'] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def parse_traceparent(header: str) -> Optional[tuple]:
+    """(trace_id, span_id) of a W3C traceparent header, or None when it is malformed."""
+    parts = header.strip().split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return parts[1].lower(), parts[2].lower()
+
+
+class SpanExporter:
+    """Receives finished spans. Subclasses override export, and shutdown when they hold resources."""
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps finished spans in a list, for tests and interactive inspection."""
+
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """
+    Appends spans to a file as OTLP/JSON, one ExportTraceServiceRequest per
+    line, the format of the OpenTelemetry Collector's file exporter and
+    otlpjsonfile receiver.
+    """
+
+    def __init__(self, path: str, service_name: str = 'babyagi'):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def export(self, spans: List[Span]) -> None:
+        request = {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+                'scopeSpans': [{
+                    'scope': {'name': 'babyagi.functionz'},
+                    'spans': [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+        line = json.dumps(request, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Creates spans for executions and hands finished ones to an exporter."""
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def start_span(self, name: str, parent: Union['Span', str, None] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """
+        Starts a span under `parent`: a Span, a W3C traceparent string, or
+        None for the span active in the current context (a new trace when
+        there is none).
+        """
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, str):
+            parent = parse_traceparent(parent)
+            trace_id, parent_span_id = parent if parent else (None, None)
+        elif parent is not None:
+            trace_id, parent_span_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_span_id = None, None
+        return Span(name, trace_id or f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}",
+                    parent_span_id, attributes=attributes)
+
+    def end_span(self, span: Span, error: Optional[str] = None, end_ns: Optional[int] = None) -> None:
+        span.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if error is None:
+            span.status = STATUS_OK
+        else:
+            span.status = STATUS_ERROR
+            span.status_message = error
+        self.export([span])
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            # Tracing must never fail the traced call
+            logger.error(f"Failed to export {len(spans)} span(s): {str(e)}")
+
+    @staticmethod
+    def activate(span: Span) -> Token:
+        return _current_span.set(span)
+
+    @staticmethod
+    def deactivate(token: Token) -> None:
+        _current_span.reset(token)
@@ -0,0 +1,113 @@
+# core/validation.py
+
+import inspect
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ('true', '1', 'yes', 'y', 'on'):
+            return True
+        if lowered in ('false', '0', 'no', 'n', 'off', ''):
+            return False
+        raise ValueError(f"cannot interpret '{value}' as bool")
+    return bool(value)
+
+
+def _from_json(expected: type) -> Callable[[Any], Any]:
+    def coerce(value: Any) -> Any:
+        value = json.loads(value) if isinstance(value, str) else expected(value)
+        if not isinstance(value, expected):
+            raise ValueError(f"expected {expected.__name__}")
+        return value
+    return coerce
+
+
+# Annotation (as captured by parse_function_parameters) -> (type, coercer)
+COERCIONS: Dict[str, tuple] = {
+    'int': (int, int),
+    'float': (float, float),
+    'str': (str, str),
+    'bool': (bool, _to_bool),
+    'list': (list, _from_json(list)),
+    'List': (list, _from_json(list)),
+    'dict': (dict, _from_json(dict)),
+    'Dict': (dict, _from_json(dict)),
+}
+
+
+class ArgumentValidator:
+    """
+    Binds and validates call arguments for one function version.
+
+    Built once per (name, version) from the compiled function, it keeps the
+    signature, the parameter layout and the required-parameter set, so
+    binding a plain positional-or-keyword call is a few dict operations
+    rather than a full Signature.bind. When the function's metadata sets
+    "coerce_types", arguments are converted to their annotated scalar or
+    JSON container types (int, float, str, bool, list, dict).
+    """
+
+    def __init__(self, function_version: Dict[str, Any], func: Callable):
+        self.function_name = function_version['name']
+        self.signature = inspect.signature(func)
+        parameters = self.signature.parameters.values()
+        self._names = [p.name for p in parameters]
+        self._defaults = {p.name: p.default for p in parameters if p.default is not inspect.Parameter.empty}
+        self._simple = all(p.kind is inspect.Parameter.POSITIONAL_OR_KEYWORD for p in parameters)
+        self.required = frozenset(param['name'] for param in function_version.get('input_parameters') or [])
+        # Required names the signature can never bind make every call fail
+        self._unbindable = sorted(self.required.difference(self._names)) if self._simple else []
+
+        self._coercers: List[tuple] = []
+        if (function_version.get('metadata') or {}).get('coerce_types'):
+            for param in function_version.get('input_parameters') or []:
+                rule = COERCIONS.get(param.get('type'))
+                if rule is not None and param['name'] in self.signature.parameters:
+                    self._coercers.append((param['name'],) + rule)
+
+    def bind(self, args: tuple, kwargs: Dict[str, Any]) -> inspect.BoundArguments:
+        arguments = self._bind_simple(args, kwargs) if self._simple else None
+        if arguments is None:
+            # Signature.bind raises the same TypeError a direct call would
+            bound_args = self.signature.bind(*args, **kwargs)
+            bound_args.apply_defaults()
+            arguments = bound_args.arguments
+            missing = [name for name in self.required if name not in arguments]
+        else:
+            bound_args = inspect.BoundArguments(self.signature, arguments)
+            missing = self._unbindable
+        if missing:
+            raise ValueError(f"Missing required input parameter '{missing[0]}' for function '{self.function_name}'")
+
+        for name, expected, coerce in self._coercers:
+            value = arguments[name]
+            if value is not None and (not isinstance(value, expected) or (expected is int and isinstance(value, bool))):
+                try:
+                    arguments[name] = coerce(value)
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Parameter '{name}' of function '{self.function_name}' "
+                                     f"expects {expected.__name__}: {str(e)}")
+        return bound_args
+
+    def _bind_simple(self, args: tuple, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Binds without Signature.bind; None means the slow path must handle (or reject) the call."""
+        names = self._names
+        if len(args) > len(names):
+            return None
+        arguments = dict(zip(names, args))
+        used = 0
+        for name in names[len(args):]:
+            if name in kwargs:
+                arguments[name] = kwargs[name]
+                used += 1
+            elif name in self._defaults:
+                arguments[name] = self._defaults[name]
+            else:
+                return None
+        # Unknown keywords, or keywords repeating a positional argument
+        if used != len(kwargs):
+            return None
+        return arguments
@@ -1,9 +1,12 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable
 from contextlib import contextmanager
 from datetime import datetime
+import threading
+import weakref
 
 from .local_db import LocalDB
 from .base_db import BaseDB
+from .log_writer import BufferedLogWriter
 from .models import Import, Function, FunctionVersion, Log
 
 class ImportResult:
@@ -12,17 +15,52 @@ class ImportResult:
         self.source = source
 
 class DBRouter(BaseDB):
-    def __init__(self, db_type: str = 'local', **kwargs):
+    # Every live router, so cache invalidation reaches all routers that share a database
+    _instances = weakref.WeakSet()
+
+    def __init__(self, db_type: str = 'local', buffer_logs: bool = False, **kwargs):
         if db_type == 'local':
             self.db = LocalDB(**kwargs)
         else:
             raise ValueError(f"Unsupported database type: {db_type}")
+        # Decrypted secrets, loaded on first use and dropped by add_secret_key
+        self._secret_cache: Optional[Dict[str, str]] = None
+        self._secret_lock = threading.Lock()
+        # Reverse trigger index: triggering function name -> triggered function names
+        self._trigger_index: Optional[Dict[str, List[str]]] = None
+        self._trigger_lock = threading.Lock()
+        self._version_listeners: List[Callable[[str], None]] = []
+        self.log_writer: Optional[BufferedLogWriter] = None
+        DBRouter._instances.add(self)
+        # A buffer enabled on a router for the same database is shared, so log ids come from one counter
+        self.log_writer = next((router.log_writer for router in self._peers() if router.log_writer is not None), None)
+        if buffer_logs:
+            self.enable_log_buffer()
 
     @contextmanager
     def session_scope(self):
         with self.db.session_scope() as session:
             yield session
 
+    def add_version_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a callback invoked with a function name whenever its active version changes."""
+        self._version_listeners.append(listener)
+
+    def _peers(self) -> List['DBRouter']:
+        url = str(self.db.engine.url)
+        return [router for router in list(DBRouter._instances) if str(router.db.engine.url) == url]
+
+    def _function_version_changed(self, name: str, triggers: Optional[List[str]]) -> None:
+        for router in self._peers():
+            router._index_triggers(name, triggers)
+            for listener in router._version_listeners:
+                listener(name)
+
+    @contextmanager
+    def unit_of_work(self):
+        with self.db.unit_of_work() as session:
+            yield session
+
     # Function management
     def add_function(self, name: str, code: str, metadata: Optional[Dict[str, Any]] = None, 
                      dependencies: Optional[List[str]] = None, 
@@ -32,6 +70,7 @@ class DBRouter(BaseDB):
                      imports: Optional[List[str]] = None) -> None:
         with self.session_scope() as session:
             self.db.add_or_update_function(session, name, code, metadata, dependencies, triggers, input_parameters, output_parameters, imports)
+        self._function_version_changed(name, triggers)
 
     def update_function(self, name: str, code: Optional[str] = None, 
                         metadata: Optional[Dict[str, Any]] = None, 
@@ -42,18 +81,21 @@ class DBRouter(BaseDB):
                         imports: Optional[List[str]] = None) -> None:
         with self.session_scope() as session:
             function = self.db.get_function(session, name)
-            if function:
-                active_version = self.db.get_active_version(session, function)
-                self.db.add_or_update_function(
-                    session, name, 
-                    code if code is not None else active_version.code,
-                    metadata or active_version.function_metadata,
-                    dependencies, 
-                    triggers if triggers is not None else active_version.triggers,
-                    input_parameters or active_version.input_parameters,
-                    output_parameters or active_version.output_parameters,
-                    imports
-                )
+            if not function:
+                return
+            active_version = self.db.get_active_version(session, function)
+            triggers = triggers if triggers is not None else active_version.triggers
+            self.db.add_or_update_function(
+                session, name, 
+                code if code is not None else active_version.code,
+                metadata or active_version.function_metadata,
+                dependencies, 
+                triggers,
+                input_parameters or active_version.input_parameters,
+                output_parameters or active_version.output_parameters,
+                imports
+            )
+        self._function_version_changed(name, triggers)
 
     def get_function(self, name: str) -> Optional[Dict[str, Any]]:
         with self.session_scope() as session:
@@ -75,6 +117,26 @@ class DBRouter(BaseDB):
                     }
             return None
 
+    def get_function_closure(self, name: str) -> Dict[str, Dict[str, Any]]:
+        with self.session_scope() as session:
+            versions = self.db.get_function_closure(session, name)
+            return {
+                v.function.name: {
+                    'name': v.function.name,
+                    'version': v.version,
+                    'code': v.code,
+                    'metadata': v.function_metadata,
+                    'dependencies': [dep.name for dep in v.dependencies],
+                    'imports': [imp.name for imp in v.imports],
+                    'function_imports': [{"name": imp.name, "source": imp.source, "lib": imp.lib} for imp in v.imports],
+                    'created_date': v.created_date.isoformat(),
+                    'input_parameters': v.input_parameters,
+                    'output_parameters': v.output_parameters,
+                    'triggers': v.triggers
+                }
+                for v in versions
+            }
+
     def get_all_functions(self) -> List[Dict[str, Any]]:
         with self.session_scope() as session:
             functions = self.db.get_all_functions(session)
@@ -100,6 +162,7 @@ class DBRouter(BaseDB):
             function = self.db.get_function(session, name)
             if function:
                 session.delete(function)
+        self._function_version_changed(name, None)
 
     def get_function_versions(self, name: str) -> List[Dict[str, Any]]:
         with self.session_scope() as session:
@@ -124,9 +187,14 @@ class DBRouter(BaseDB):
     def activate_function_version(self, name: str, version: int) -> None:
         with self.session_scope() as session:
             function = self.db.get_function(session, name)
-            if function:
-                for v in function.versions:
-                    v.is_active = (v.version == version)
+            if not function:
+                return
+            triggers = None
+            for v in function.versions:
+                v.is_active = (v.version == version)
+                if v.is_active:
+                    triggers = v.triggers
+        self._function_version_changed(name, triggers)
 
     # Import management
     def add_import(self, name: str, source: str, lib: Optional[str] = None) -> None:
@@ -150,6 +218,30 @@ class DBRouter(BaseDB):
             return []
 
     # Logging
+    def enable_log_buffer(self, batch_size: int = 200, flush_interval: float = 0.5,
+                          max_queue_size: int = 10000) -> None:
+        if self.log_writer is not None:
+            return
+        # Every router on this database writes logs through the one buffer: ids are allocated
+        # ahead of the insert, so a second writer would hand out the same ids
+        writer = BufferedLogWriter(self.db, batch_size=batch_size, flush_interval=flush_interval,
+                                   max_queue_size=max_queue_size)
+        for router in self._peers():
+            router.log_writer = writer
+
+    def flush_logs(self) -> None:
+        if self.log_writer is not None:
+            self.log_writer.flush()
+
+    def close(self) -> None:
+        writer = self.log_writer
+        if writer is not None:
+            writer.close()
+            for router in self._peers():
+                if router.log_writer is writer:
+                    router.log_writer = None
+            self.log_writer = None
+
     def add_log(self, function_name: str, message: str, timestamp: datetime, 
                 params: Optional[Dict[str, Any]] = None, 
                 output: Optional[Any] = None, 
@@ -157,6 +249,20 @@ class DBRouter(BaseDB):
                 parent_log_id: Optional[int] = None, 
                 triggered_by_log_id: Optional[int] = None, 
                 log_type: str = 'info') -> int:
+        if self.log_writer is not None:
+            log_id = self.log_writer.allocate_id()
+            self.log_writer.add(log_id, {
+                'function_name': function_name,
+                'message': message,
+                'timestamp': timestamp,
+                'params': params,
+                'output': output,
+                'time_spent': time_spent,
+                'parent_log_id': parent_log_id,
+                'triggered_by_log_id': triggered_by_log_id,
+                'log_type': log_type
+            })
+            return log_id
         with self.session_scope() as session:
             return self.db.add_log(
                 session=session,
@@ -171,7 +277,31 @@ class DBRouter(BaseDB):
                 log_type=log_type
             )
 
+    def add_logs(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Adds many logs at once; a row's 'parent_index' points at an earlier row as its parent."""
+        if not rows:
+            return []
+        if self.log_writer is not None:
+            log_ids = []
+            for row in rows:
+                row = dict(row)
+                parent_index = row.pop('parent_index', None)
+                if parent_index is not None:
+                    row['parent_log_id'] = log_ids[parent_index]
+                log_id = self.log_writer.allocate_id()
+                self.log_writer.add(log_id, row)
+                log_ids.append(log_id)
+            return log_ids
+        with self.session_scope() as session:
+            return self.db.add_logs(session, rows)
+
     def update_log(self, log_id: int, **kwargs) -> None:
+        if self.log_writer is not None:
+            for key in kwargs:
+                if not hasattr(Log, key):
+                    raise ValueError(f"Log has no attribute '{key}'")
+            self.log_writer.update(log_id, kwargs)
+            return
         with self.session_scope() as session:
             self.db.update_log(
                 session=session,
@@ -181,6 +311,9 @@ class DBRouter(BaseDB):
 
 
     def update_log_params(self, log_id: int, params: Dict[str, Any]) -> None:
+        if self.log_writer is not None:
+            self.log_writer.update(log_id, {'params': params})
+            return
         with self.session_scope() as session:
             self.db.update_log_params(
                 session=session,
@@ -194,6 +327,7 @@ class DBRouter(BaseDB):
                  start_date: Optional[datetime] = None, 
                  end_date: Optional[datetime] = None, 
                  triggered_by_log_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        self.flush_logs()
         with self.session_scope() as session:
             logs = self.db.get_logs(session, function_name, start_date, end_date, triggered_by_log_id)
             return [
@@ -207,12 +341,18 @@ class DBRouter(BaseDB):
                     'time_spent': log.time_spent,
                     'parent_log_id': log.parent_log_id,
                     'triggered_by_log_id': log.triggered_by_log_id,
-                    'log_type': log.log_type
+                    'log_type': log.log_type,
+                    'wait_time': log.wait_time,
+                    'phases': log.phases,
+                    'cpu_time': log.cpu_time,
+                    'peak_memory': log.peak_memory,
+                    'allocated_blocks': log.allocated_blocks
                 }
                 for log in logs
             ]
 
     def get_log_bundle(self, log_id: int) -> List[Dict[str, Any]]:
+        self.flush_logs()
         with self.session_scope() as session:
             logs_collected = {}
 
@@ -244,6 +384,7 @@ class DBRouter(BaseDB):
                     fetch_related_logs(child.id)
 
             fetch_related_logs(log_id)
+            profiled = self.db.get_profiled_log_ids(session, logs_collected)
 
             # Convert logs to dictionaries
             all_logs = [
@@ -257,13 +398,36 @@ class DBRouter(BaseDB):
                     'time_spent': log.time_spent,
                     'parent_log_id': log.parent_log_id,
                     'triggered_by_log_id': log.triggered_by_log_id,
-                    'log_type': log.log_type
+                    'log_type': log.log_type,
+                    'wait_time': log.wait_time,
+                    'phases': log.phases,
+                    'cpu_time': log.cpu_time,
+                    'peak_memory': log.peak_memory,
+                    'allocated_blocks': log.allocated_blocks,
+                    'has_profile': log.id in profiled
                 }
                 for log in logs_collected.values()
             ]
 
             return all_logs
 
+    def add_profile(self, log_id: int, stacks: str, samples: int, interval: float) -> None:
+        with self.session_scope() as session:
+            self.db.add_profile(session, log_id, stacks, samples, interval)
+
+    def get_profile(self, log_id: int) -> Optional[Dict[str, Any]]:
+        with self.session_scope() as session:
+            profile = self.db.get_profile(session, log_id)
+            if profile is None:
+                return None
+            return {
+                'log_id': profile.log_id,
+                'interval': profile.interval,
+                'samples': profile.samples,
+                'stacks': profile.stacks,
+                'created_date': profile.created_date.isoformat() if profile.created_date else None
+            }
+
 
     
     # Secret key management
@@ -274,29 +438,62 @@ class DBRouter(BaseDB):
                 existing_key.value = key_value
             else:
                 self.db.add_secret_key(session, key_name, key_value)
+        for router in self._peers():
+            with router._secret_lock:
+                router._secret_cache = None
 
     def get_secret_key(self, key_name: str) -> Optional[str]:
-        with self.session_scope() as session:
-            secret_key = self.db.get_secret_key(session, key_name)
-            return secret_key.value if secret_key else None
+        return self._get_secret_cache().get(key_name)
 
     def get_all_secret_keys(self) -> Dict[str, str]:
-        with self.session_scope() as session:
-            secret_keys = self.db.get_all_secret_keys(session)
-            return {key.name: key.value for key in secret_keys if key.value is not None}
+        return dict(self._get_secret_cache())
+
+    def _get_secret_cache(self) -> Dict[str, str]:
+        secrets = self._secret_cache
+        if secrets is None:
+            with self._secret_lock:
+                if self._secret_cache is None:
+                    with self.session_scope() as session:
+                        secret_keys = self.db.get_all_secret_keys(session)
+                        self._secret_cache = {key.name: key.value for key in secret_keys if key.value is not None}
+                secrets = self._secret_cache
+        return secrets
 
     # Trigger management
     def add_trigger(self, triggered_function_name: str, triggering_function_name: Optional[str] = None) -> None:
         with self.session_scope() as session:
             self.db.add_trigger(session, triggered_function_name, triggering_function_name)
+        with self._trigger_lock:
+            self._trigger_index = None
 
     def get_triggers_for_function(self, function_name: str) -> List[str]:
-        with self.session_scope() as session:
-            all_functions = self.db.get_all_functions(session)
-            triggered_functions = []
-            for func in all_functions:
-                active_version = self.db.get_active_version(session, func)
-                if active_version and active_version.triggers:
-                    if function_name in active_version.triggers:
-                        triggered_functions.append(func.name)
-            return triggered_functions
\ No newline at end of file
+        return list(self._get_trigger_index().get(function_name, ()))
+
+    def _get_trigger_index(self) -> Dict[str, List[str]]:
+        index = self._trigger_index
+        if index is None:
+            with self._trigger_lock:
+                if self._trigger_index is None:
+                    index = {}
+                    with self.session_scope() as session:
+                        for name, triggers in self.db.get_active_triggers(session):
+                            for triggering_name in triggers or []:
+                                index.setdefault(triggering_name, []).append(name)
+                    self._trigger_index = index
+                index = self._trigger_index
+        return index
+
+    def _index_triggers(self, name: str, triggers: Optional[List[str]]) -> None:
+        """Replace the index entries of a function with its current active triggers."""
+        with self._trigger_lock:
+            if self._trigger_index is None:
+                return
+            index = {}
+            for triggering_name, triggered in self._trigger_index.items():
+                triggered = [t for t in triggered if t != name]
+                if triggered:
+                    index[triggering_name] = triggered
+            for triggering_name in triggers or []:
+                index.setdefault(triggering_name, []).append(name)
+            # Swap in a new dict so readers never see a partially updated index
+            self._trigger_index = index
@@ -1,10 +1,13 @@
 # local_db.py
 
-from sqlalchemy import create_engine, or_
-from sqlalchemy.orm import sessionmaker, scoped_session, joinedload
+from sqlalchemy import create_engine, event, or_, select, insert, update, inspect, text
+from sqlalchemy.orm import sessionmaker, scoped_session, joinedload, aliased
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
-from .models import Base, Function, FunctionVersion, Import, Log, SecretKey, fernet
+import array
+import threading
+from .models import Base, Function, FunctionVersion, Import, Log, Profile, SecretKey, fernet, function_dependency
+from ..core.metrics import QueryStats
 import datetime
 
 
@@ -12,11 +15,42 @@ import datetime
 class LocalDB:
     def __init__(self, db_path='sqlite:///funztionz.db'):
         self.engine = create_engine(db_path)
+        # Statement timings for the metrics endpoint
+        self.query_stats = QueryStats()
+        event.listen(self.engine, 'before_cursor_execute', self.query_stats.before_cursor_execute)
+        event.listen(self.engine, 'after_cursor_execute', self.query_stats.after_cursor_execute)
         Base.metadata.create_all(self.engine)
+        self._add_missing_columns()
         self.Session = scoped_session(sessionmaker(bind=self.engine))
+        self._local = threading.local()
+
+    def _add_missing_columns(self):
+        """
+        create_all does not alter existing tables, so nullable columns added to
+        the models since a database was created are added here.
+        """
+        inspector = inspect(self.engine)
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing and column.nullable:
+                        column_type = column.type.compile(dialect=self.engine.dialect)
+                        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
 
     @contextmanager
     def session_scope(self):
+        if getattr(self._local, 'depth', 0):
+            # Inside a unit of work: share its session and leave the commit to it
+            self._local.depth += 1
+            try:
+                yield self.Session()
+            finally:
+                self._local.depth -= 1
+            return
+
         session = self.Session()
         try:
             yield session
@@ -27,10 +61,39 @@ class LocalDB:
         finally:
             self.Session.remove()
 
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Groups every session_scope opened by this thread into one session and
+        one commit. Non-database errors still commit, so logs recording the
+        failure are kept; database errors roll the whole unit back.
+        """
+        if getattr(self._local, 'depth', 0):
+            with self.session_scope() as session:
+                yield session
+            return
+
+        session = self.Session()
+        self._local.depth = 1
+        try:
+            yield session
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+        except BaseException:
+            session.commit()
+            raise
+        else:
+            session.commit()
+        finally:
+            self._local.depth = 0
+            self.Session.remove()
+
     def serialize_for_json(self, obj):
         """
         Recursively convert datetime objects to ISO format strings within the given object.
-        Handles dictionaries, lists, and individual datetime objects.
+        Handles dictionaries, lists, and individual datetime objects. Binary buffers
+        are logged as a short summary rather than their contents.
         """
         if isinstance(obj, dict):
             return {k: self.serialize_for_json(v) for k, v in obj.items()}
@@ -38,6 +101,8 @@ class LocalDB:
             return [self.serialize_for_json(element) for element in obj]
         elif isinstance(obj, datetime.datetime):
             return obj.isoformat()
+        elif isinstance(obj, (bytes, bytearray, memoryview, array.array)):
+            return f"<{type(obj).__name__}: {memoryview(obj).nbytes} bytes>"
         else:
             return obj
 
@@ -55,6 +120,38 @@ class LocalDB:
             joinedload(Function.versions).joinedload(FunctionVersion.dependencies)
         ).all()
 
+    def get_active_triggers(self, session):
+        return session.query(Function.name, FunctionVersion.triggers).join(FunctionVersion.function).filter(
+            FunctionVersion.is_active == True
+        ).all()
+
+    def get_function_closure(self, session, name):
+        """
+        Fetches the active versions of a function and all of its transitive
+        dependencies in a single query, using a recursive CTE over the
+        dependency table.
+
+        :param session: SQLAlchemy session object.
+        :param name: The name of the root function.
+        :return: List of active FunctionVersion objects, unordered.
+        """
+        closure = select(Function.id).where(Function.name == name).cte('closure', recursive=True)
+        active = aliased(FunctionVersion)
+        closure = closure.union(
+            select(function_dependency.c.dependency_id)
+            .join(active, active.id == function_dependency.c.function_version_id)
+            .join(closure, active.function_id == closure.c.id)
+            .where(active.is_active == True)
+        )
+        return session.query(FunctionVersion).filter(
+            FunctionVersion.is_active == True,
+            FunctionVersion.function_id.in_(select(closure.c.id))
+        ).options(
+            joinedload(FunctionVersion.function),
+            joinedload(FunctionVersion.dependencies),
+            joinedload(FunctionVersion.imports)
+        ).all()
+
     def add_or_update_function(self, session, name, code, metadata, dependencies, triggers, input_parameters, output_parameters, imports=None):
         function = self.get_function(session, name)
         if not function:
@@ -132,6 +229,57 @@ class LocalDB:
         session.flush()  # This ensures new_log.id is populated
         return new_log.id
 
+    def add_logs(self, session, rows) -> list:
+        """
+        Inserts log rows in one statement and returns their ids in order.
+
+        :param session: SQLAlchemy session object.
+        :param rows: Log column dicts; a row may set 'parent_index' to the position
+                     of an earlier row in the batch to use as its parent log.
+        """
+        values = []
+        for row in rows:
+            row = {key: value for key, value in row.items() if key != 'parent_index'}
+            for key in ('params', 'output'):
+                row[key] = self.serialize_for_json(row[key]) if row.get(key) else None
+            values.append(row)
+        # Rows get ascending ids in insertion order, so sorting the returned ids
+        # restores the row order without SQLAlchemy's one-statement-per-row fallback
+        result = session.execute(insert(Log).returning(Log.id), values)
+        log_ids = sorted(row[0] for row in result)
+
+        parents = [{'id': log_ids[i], 'parent_log_id': log_ids[row['parent_index']]}
+                   for i, row in enumerate(rows) if row.get('parent_index') is not None]
+        if parents:
+            session.execute(update(Log), parents)
+        return log_ids
+
+    def get_max_log_id(self, session) -> int:
+        last_log = session.query(Log.id).order_by(Log.id.desc()).first()
+        return last_log[0] if last_log else 0
+
+    def write_logs(self, session, inserts, updates) -> None:
+        """
+        Writes buffered log rows in one transaction.
+
+        :param session: SQLAlchemy session object.
+        :param inserts: List of (log_id, row) pairs for new log entries.
+        :param updates: List of (log_id, fields) pairs for existing log entries.
+        """
+        def serialize(log_id, data):
+            row = dict(data, id=log_id)
+            for key in ('params', 'output'):
+                if row.get(key):
+                    row[key] = self.serialize_for_json(row[key])
+            if isinstance(row.get('timestamp'), str):
+                row['timestamp'] = datetime.datetime.fromisoformat(row['timestamp'])
+            return row
+
+        if inserts:
+            session.bulk_insert_mappings(Log, [serialize(log_id, row) for log_id, row in inserts])
+        if updates:
+            session.bulk_update_mappings(Log, [serialize(log_id, fields) for log_id, fields in updates])
+
     def update_log(self, session, log_id: int, **kwargs) -> None:
         # Fetch the log entry by id
         log_entry = session.query(Log).filter(Log.id == log_id).first()
@@ -139,6 +287,8 @@ class LocalDB:
             # Update only the fields provided in kwargs
             for key, value in kwargs.items():
                 if hasattr(log_entry, key):
+                    if key in ('params', 'output'):
+                        value = self.serialize_for_json(value)
                     setattr(log_entry, key, value)
                 else:
                     raise ValueError(f"Log has no attribute '{key}'")
@@ -153,7 +303,7 @@ class LocalDB:
         if log_entry is None:
             raise ValueError(f"Log entry with id {log_id} not found.")
 
-        log_entry.params = params
+        log_entry.params = self.serialize_for_json(params)
         session.commit()
 
 
@@ -229,6 +379,15 @@ class LocalDB:
         fetch_related_logs(log_id)
         return list(logs_collected.values())
 
+    def add_profile(self, session, log_id: int, stacks: str, samples: int, interval: float) -> None:
+        session.merge(Profile(log_id=log_id, stacks=stacks, samples=samples, interval=interval))
+
+    def get_profile(self, session, log_id: int):
+        return session.query(Profile).filter_by(log_id=log_id).one_or_none()
+
+    def get_profiled_log_ids(self, session, log_ids) -> set:
+        return {row.log_id for row in session.query(Profile.log_id).filter(Profile.log_id.in_(list(log_ids)))}
+
 
 
 
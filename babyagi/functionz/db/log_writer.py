@@ -0,0 +1,135 @@
+# db/log_writer.py
+
+import atexit
+import itertools
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_FLUSH = object()
+_STOP = object()
+
+
+class BufferedLogWriter:
+    """
+    Write-behind buffer for the logs table.
+
+    Log ids are handed out synchronously from an in-process counter seeded with
+    the current maximum id, so callers (and child executions) can use them
+    immediately. Insert and update events are queued, coalesced per log id by a
+    background thread and written in batched transactions once `batch_size`
+    rows are pending or `flush_interval` seconds have passed.
+
+    The buffer assumes it is the only writer to the logs table while it is
+    enabled; DBRouter shares one buffer between all routers on the same
+    database, and other processes must not write logs meanwhile.
+    """
+
+    def __init__(self, db, batch_size: int = 200, flush_interval: float = 0.5,
+                 max_queue_size: int = 10000):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._pending_inserts: Dict[int, Dict[str, Any]] = {}
+        self._pending_updates: Dict[int, Dict[str, Any]] = {}
+        self._closed = False
+
+        with db.session_scope() as session:
+            self._ids = itertools.count(db.get_max_log_id(session) + 1)
+        self._id_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run, name='functionz-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def allocate_id(self) -> int:
+        with self._id_lock:
+            return next(self._ids)
+
+    def add(self, log_id: int, row: Dict[str, Any]) -> None:
+        self._put(('add', log_id, row))
+
+    def update(self, log_id: int, fields: Dict[str, Any]) -> None:
+        self._put(('update', log_id, fields))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every event queued before this call has been written."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put((_FLUSH, done, None))
+        done.wait(timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((_STOP, None, None))
+        self._thread.join()
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._pending_inserts) + len(self._pending_updates)
+
+    def _put(self, event) -> None:
+        if self._closed:
+            raise RuntimeError("Log writer has been closed.")
+        # Blocks when the queue is full, applying backpressure to callers
+        self._queue.put(event)
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                kind, key, data = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                kind = None
+
+            if kind == 'add':
+                self._pending_inserts[key] = data
+            elif kind == 'update':
+                # Coalesce into the pending insert when the row has not been written yet
+                if key in self._pending_inserts:
+                    self._pending_inserts[key].update(data)
+                else:
+                    self._pending_updates.setdefault(key, {}).update(data)
+
+            pending = len(self._pending_inserts) + len(self._pending_updates)
+            if (kind in (_FLUSH, _STOP) or pending >= self.batch_size
+                    or time.monotonic() >= deadline):
+                self._write_pending()
+                deadline = time.monotonic() + self.flush_interval
+
+            if kind is _FLUSH:
+                key.set()
+            elif kind is _STOP:
+                return
+
+    def _write_pending(self) -> None:
+        if not self._pending_inserts and not self._pending_updates:
+            return
+        inserts = list(self._pending_inserts.items())
+        updates = list(self._pending_updates.items())
+        self._pending_inserts = {}
+        self._pending_updates = {}
+        try:
+            with self.db.session_scope() as session:
+                self.db.write_logs(session, inserts, updates)
+        except Exception as e:
+            # One bad row must not drop the whole batch; retry row by row
+            logger.error(f"Batched log write failed, retrying individually: {str(e)}")
+            for log_id, row in inserts:
+                self._write_one(log_id, [(log_id, row)], [])
+            for log_id, fields in updates:
+                self._write_one(log_id, [], [(log_id, fields)])
+
+    def _write_one(self, log_id, inserts, updates) -> None:
+        try:
+            with self.db.session_scope() as session:
+                self.db.write_logs(session, inserts, updates)
+        except Exception as e:
+            logger.error(f"Dropping buffered log {log_id}: {str(e)}")
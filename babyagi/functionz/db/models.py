@@ -87,6 +87,14 @@ class Log(Base):
     output = Column(JSON, nullable=True)
     time_spent = Column(Float, nullable=True)
     log_type = Column(String, nullable=False)
+    # Seconds spent queued for a concurrency slot (functions with max_concurrency)
+    wait_time = Column(Float, nullable=True)
+    # Seconds spent in each phase of the execution, e.g. {"fetch": 0.001, "execute": 0.2}
+    phases = Column(JSON, nullable=True)
+    # Resource usage of functions registered with metadata={"track_resources": True}
+    cpu_time = Column(Float, nullable=True)  # CPU seconds of the executing thread
+    peak_memory = Column(Integer, nullable=True)  # Peak traced bytes above the level at the start
+    allocated_blocks = Column(Integer, nullable=True)  # Net memory blocks allocated
 
     # Parent Log Relationship
     parent_log_id = Column(Integer, ForeignKey('logs.id'), nullable=True)
@@ -107,6 +115,17 @@ class Log(Base):
     )
 
 
+class Profile(Base):
+    __tablename__ = 'profiles'
+
+    # One sampled profile per profiled execution
+    log_id = Column(Integer, ForeignKey('logs.id'), primary_key=True)
+    interval = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+    stacks = Column(String, nullable=False)  # Collapsed stacks: "frame;frame;frame count" per line
+    created_date = Column(DateTime, default=datetime.utcnow)
+
+
 class SecretKey(Base):
     __tablename__ = 'secret_keys'
     id = Column(Integer, primary_key=True)
@@ -27,11 +27,19 @@ def description_writer(function_code: str) -> str:
     return description
 
 @func.register_function(
-    metadata={"description": "Generates and updates descriptions for functions lacking one or having an empty description"},
+    metadata={
+        "description": "Generates and updates descriptions for functions lacking one or having an empty description",
+        "trigger_mode": "deferred",
+        "coalesce_window": 2.0,
+        "batch_trigger": True
+    },
     dependencies=["description_writer"],
     triggers=["function_added_or_updated"]
 )
-def ai_description_generator(function_name: str) -> None:
+def ai_description_generator(function_name) -> None:
+    if isinstance(function_name, list):
+        # Coalesced trigger batches pass every function name at once
+        return [ai_description_generator(name) for name in function_name]
     print(f"Generating AI description for function: {function_name}")
     function = func.db.get_function(function_name)
     if not function:
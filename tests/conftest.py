@@ -0,0 +1,12 @@
+import pytest
+
+from babyagi.functionz.core.framework import Functionz
+
+
+@pytest.fixture
+def functionz(tmp_path):
+    """A Functionz instance on a database of its own."""
+    instance = Functionz(db_path=f"sqlite:///{tmp_path / 'functionz.db'}")
+    yield instance
+    instance.executor.shutdown_process_pool()
+    instance.db.close()
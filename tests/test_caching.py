@@ -0,0 +1,12 @@
+def test_mutating_a_cached_result_does_not_change_later_hits(functionz):
+    @functionz.register_function(metadata={'cache': True})
+    def make_list(x):
+        return [x]
+
+    first = functionz.execute_function('make_list', 1)
+    first.append(99)
+    second = functionz.execute_function('make_list', 1)
+    assert second == [1]
+    second.append(5)
+    assert functionz.execute_function('make_list', 1) == [1]
+    assert functionz.executor.result_cache.hits == 2
@@ -0,0 +1,57 @@
+import pytest
+
+from babyagi.functionz.core.circuit_breaker import CircuitOpenError
+from babyagi.functionz.core.timeouts import FunctionTimeout
+
+
+def _open_breaker(functionz, name):
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            functionz.execute_function(name, 0)
+    assert functionz.get_breaker_states()[name]['state'] == 'open'
+
+
+def test_open_breaker_rejects_batch(functionz):
+
+    @functionz.register_function(metadata={'circuit_breaker': {'min_calls': 2, 'reset_timeout': 60}})
+    def bad(x):
+        raise ValueError('nope')
+
+    _open_breaker(functionz, 'bad')
+    with pytest.raises(CircuitOpenError):
+        list(functionz.execute_many('bad', [0, 0]))
+    assert functionz.get_logs('bad')[-1]['log_type'] == 'circuit_open'
+
+
+def test_breaker_opening_mid_batch_rejects_remaining_items(functionz):
+    @functionz.register_function(metadata={'circuit_breaker': {'min_calls': 2, 'reset_timeout': 60}})
+    def bad(x):
+        raise ValueError('nope')
+
+    results = list(functionz.execute_many('bad', [0] * 5, return_exceptions=True))
+    assert [type(result) for result in results] == [ValueError, ValueError] + [CircuitOpenError] * 3
+    assert functionz.get_breaker_states()['bad']['state'] == 'open'
+
+
+def test_rejected_items_return_fallback(functionz):
+    @functionz.register_function(metadata={'circuit_breaker': {'min_calls': 2, 'fallback': -1}})
+    def flaky(x):
+        if x < 0:
+            raise ValueError('negative')
+        return x
+
+    results = list(functionz.execute_many('flaky', [-1, -1, 5], return_exceptions=True))
+    assert [type(result) for result in results[:2]] == [ValueError, ValueError]
+    assert results[2] == -1
+
+
+def test_batch_items_respect_timeout(functionz):
+    @functionz.register_function(metadata={'timeout': 0.2})
+    def slow(delay):
+        import time
+        time.sleep(delay)
+        return delay
+
+    results = list(functionz.execute_many('slow', [0, 1, 0], return_exceptions=True))
+    assert results[0] == 0 and results[2] == 0
+    assert isinstance(results[1], FunctionTimeout)
@@ -0,0 +1,32 @@
+import itertools
+
+
+def test_results_stream_from_unbounded_input(functionz):
+    @functionz.register_function()
+    def square(x):
+        return x * x
+
+    pulled = []
+
+    def numbers():
+        for i in itertools.count():
+            pulled.append(i)
+            yield i
+
+    results = functionz.execute_many('square', numbers(), max_workers=2)
+    assert next(results) == 0
+    # Only a small window of items is read ahead of the results taken
+    assert len(pulled) <= 5
+    assert [next(results) for _ in range(10)] == [i * i for i in range(1, 11)]
+    assert len(pulled) <= 15
+    results.close()
+
+
+def test_results_keep_input_order(functionz):
+    @functionz.register_function()
+    def slow_when_even(x):
+        import time
+        time.sleep(0.02 if x % 2 == 0 else 0)
+        return x
+
+    assert list(functionz.execute_many('slow_when_even', range(20), max_workers=4)) == list(range(20))
@@ -0,0 +1,36 @@
+import threading
+
+from babyagi.functionz.core.framework import Functionz
+
+
+def test_routers_on_one_database_allocate_unique_log_ids(functionz):
+    @functionz.register_function()
+    def inc(x):
+        return x + 1
+
+    # Logs written before the buffer exists; its counter starts above them
+    for i in range(3):
+        functionz.execute_function('inc', i)
+    other = Functionz(db_path=str(functionz.db.db.engine.url))
+    try:
+        functionz.enable_log_buffer(flush_interval=0.05)
+        assert other.db.log_writer is functionz.db.log_writer
+
+        def run(instance):
+            for i in range(50):
+                instance.execute_function('inc', i)
+
+        threads = [threading.Thread(target=run, args=(instance,)) for instance in (functionz, other) * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        functionz.db.flush_logs()
+
+        logs = functionz.get_logs('inc')
+        assert len(logs) == 3 + 4 * 50
+        assert len({log['id'] for log in logs}) == len(logs)
+        assert all(log['log_type'] == 'success' for log in logs)
+    finally:
+        other.db.close()
+        other.executor.shutdown_process_pool()
@@ -0,0 +1,23 @@
+from babyagi.functionz.core.metrics import render_prometheus
+
+
+def test_fast_path_and_batch_calls_reach_aggregates(functionz):
+    @functionz.register_function()
+    def dep(x):
+        return x + 1
+
+    @functionz.register_function(dependencies=['dep'])
+    def top(x):
+        return dep(x) + dep(x)
+
+    for i in range(3):
+        functionz.execute_function('top', i)
+    list(functionz.execute_many('dep', range(4)))
+
+    calls = {name: stats['calls'] for name, stats in functionz.executor.call_stats.snapshot().items()}
+    assert calls == {'top': {'success': 3}, 'dep': {'success': 10}}
+    recent = functionz.get_recent_executions('dep')
+    assert len(recent) == 10
+    assert all(entry['log_id'] is not None for entry in recent)
+    assert functionz.get_phase_stats('dep')['dep']['execute']['count'] == 10
+    assert 'functionz_calls_total{function="dep",status="success"} 10' in render_prometheus(functionz)
@@ -0,0 +1,54 @@
+import glob
+import os
+import time
+
+import pytest
+
+from babyagi.functionz.core.timeouts import FunctionTimeout
+
+pytestmark = pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason="needs /dev/shm to list segments")
+
+
+def _segments():
+    return glob.glob(f"/dev/shm/fz{os.getpid():x}_*")
+
+
+def _wait_for(condition, limit=5.0):
+    end = time.monotonic() + limit
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_large_arguments_and_results_leave_no_segments(functionz):
+    @functionz.register_function(metadata={'executor': 'process'})
+    def echo(data):
+        return data
+
+    payload = bytes(2 << 20)
+    assert functionz.execute_function('echo', payload) == payload
+    assert _segments() == []
+
+
+def test_result_segment_of_timed_out_call_is_removed(functionz):
+    @functionz.register_function(metadata={'executor': 'process'})
+    def late(n, delay):
+        import time
+        time.sleep(delay)
+        return bytes(n)
+
+    # Warm the pool, so the timeout below is spent in the function
+    assert len(functionz.execute_function('late', 4 << 20, 0)) == 4 << 20
+    with pytest.raises(FunctionTimeout):
+        functionz.execute_function('late', 4 << 20, 0.5, execution_timeout=0.1)
+    # The worker creates the result segment after the caller has given up on it
+    assert _wait_for(lambda: _segments() == [])
+
+
+def test_workers_do_not_import_the_babyagi_package(functionz):
+    @functionz.register_function(metadata={'executor': 'process'})
+    def loaded_packages():
+        import sys
+        return sorted(name for name in sys.modules if name.split('.')[0] == 'babyagi')
+
+    assert functionz.execute_function('loaded_packages') == []
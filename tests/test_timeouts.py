@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from babyagi.functionz.core.timeouts import FunctionTimeout
+
+
+def _run_with_watchdog(target, limit=20.0):
+    """Runs target on a thread and fails the test if it has not returned within `limit` seconds."""
+    errors = []
+
+    def run():
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(limit)
+    assert not thread.is_alive(), "execution hung"
+    if errors:
+        raise errors[0]
+
+
+def test_timeout_returns_at_deadline_while_body_blocks(functionz):
+    @functionz.register_function(metadata={'timeout': 0.3})
+    def sleeper():
+        import time
+        time.sleep(2)
+        return 'done'
+
+    start = time.monotonic()
+    with pytest.raises(FunctionTimeout):
+        functionz.execute_function('sleeper')
+    assert time.monotonic() - start < 1.0
+    assert functionz.get_logs('sleeper')[0]['log_type'] == 'timeout'
+
+
+def test_nested_calls_inherit_deadline(functionz):
+    @functionz.register_function(metadata={'max_concurrency': 1})
+    def slow_dep(x):
+        import time
+        time.sleep(1)
+        return x
+
+    @functionz.register_function(dependencies=['slow_dep'])
+    def caller(x):
+        return slow_dep(x)
+
+    start = time.monotonic()
+    with pytest.raises(FunctionTimeout):
+        functionz.execute_function('caller', 1, execution_timeout=0.2)
+    assert time.monotonic() - start < 0.8
+
+    time.sleep(0.1)
+    logs = {log['function_name']: log for log in functionz.get_logs()}
+    assert logs['caller']['log_type'] == 'timeout'
+    # The dependency ran under the caller's deadline, not one of its own
+    assert logs['slow_dep']['log_type'] == 'timeout'
+    assert logs['slow_dep']['parent_log_id'] == logs['caller']['id']
+
+
+def test_nested_calls_under_short_deadline_do_not_hang(functionz):
+    @functionz.register_function(metadata={'max_concurrency': 1})
+    def dep(x):
+        return x + 1
+
+    @functionz.register_function(metadata={'timeout': 0.003}, dependencies=['dep'])
+    def outer(n):
+        return sum(dep(i) for i in range(n))
+
+    def run_many():
+        for _ in range(60):
+            try:
+                functionz.execute_function('outer', 200)
+            except FunctionTimeout:
+                pass
+
+    _run_with_watchdog(run_many)
+    # Every abandoned body gave its concurrency slot back
+    time.sleep(0.2)
+    assert functionz.get_concurrency_stats().get('dep', {}).get('active', 0) == 0
+
+
+def test_dependency_timeout_applies_when_called_from_another_function(functionz):
+    @functionz.register_function(metadata={'timeout': 0.2})
+    def slow_dep():
+        import time
+        time.sleep(1)
+        return 'finished'
+
+    @functionz.register_function(dependencies=['slow_dep'])
+    def caller():
+        return slow_dep()
+
+    start = time.monotonic()
+    with pytest.raises(FunctionTimeout, match='slow_dep'):
+        functionz.execute_function('caller')
+    assert time.monotonic() - start < 0.8
@@ -0,0 +1,81 @@
+from babyagi.functionz.core.tracing import STATUS_ERROR, STATUS_OK, InMemorySpanExporter
+
+
+def _spans_by_name(exporter):
+    spans = {}
+    for span in exporter.get_finished_spans():
+        spans.setdefault(span.name, []).append(span)
+    return spans
+
+
+def test_dependency_calls_are_child_spans_of_the_caller(functionz):
+    exporter = InMemorySpanExporter()
+    functionz.set_span_exporter(exporter)
+
+    @functionz.register_function()
+    def dep(x):
+        return x + 1
+
+    @functionz.register_function(dependencies=['dep'])
+    def top(x):
+        return dep(x) + dep(x)
+
+    assert functionz.execute_function('top', 1) == 4
+    spans = _spans_by_name(exporter)
+    (top_span,) = spans['top']
+    assert top_span.parent_span_id is None
+    assert top_span.status == STATUS_OK
+    assert top_span.attributes['functionz.log_type'] == 'success'
+    assert len(spans['dep']) == 2
+    for span in spans['dep']:
+        assert span.trace_id == top_span.trace_id
+        assert span.parent_span_id == top_span.span_id
+        assert top_span.start_ns <= span.start_ns <= span.end_ns <= top_span.end_ns
+    log_ids = {span.attributes['functionz.log_id'] for span in spans['dep']}
+    assert len(log_ids) == 2 and None not in log_ids
+
+
+def test_traceparent_continues_a_remote_trace(functionz):
+    exporter = InMemorySpanExporter()
+    functionz.set_span_exporter(exporter)
+
+    @functionz.register_function()
+    def noop():
+        return None
+
+    trace_id, parent_id = 'ab' * 16, 'cd' * 8
+    functionz.execute_function('noop', trace_parent=f"00-{trace_id}-{parent_id}-01")
+    (span,) = exporter.get_finished_spans()
+    assert (span.trace_id, span.parent_span_id) == (trace_id, parent_id)
+    assert span.traceparent.startswith(f"00-{trace_id}-")
+
+
+def test_failed_call_ends_its_span_with_an_error(functionz):
+    exporter = InMemorySpanExporter()
+    functionz.set_span_exporter(exporter)
+
+    @functionz.register_function()
+    def fail():
+        raise ValueError("broken")
+
+    try:
+        functionz.execute_function('fail')
+    except ValueError:
+        pass
+    (span,) = exporter.get_finished_spans()
+    assert span.status == STATUS_ERROR
+    assert 'broken' in span.status_message
+
+
+def test_no_spans_once_tracing_is_turned_off(functionz):
+    exporter = InMemorySpanExporter()
+    functionz.set_span_exporter(exporter)
+
+    @functionz.register_function()
+    def noop():
+        return None
+
+    functionz.execute_function('noop')
+    functionz.set_span_exporter(None)
+    functionz.execute_function('noop')
+    assert len(exporter.get_finished_spans()) == 1